@@ -5,11 +5,6 @@ import matplotlib.patches as patches
 from tkinter.filedialog import askopenfilename, asksaveasfilename
 
 
-def rotate_position(pos, angle):
-    rad = np.radians(angle)
-    rotation_matrix = np.array([[np.cos(rad), -np.sin(rad)], [np.sin(rad), np.cos(rad)]])
-    return np.dot(rotation_matrix, pos)
-
 def fit_to_aspect_ratio(positions, aspect_ratio):
     x_coords, y_coords = zip(*positions)
     min_x, max_x = min(x_coords), max(x_coords)
@@ -31,12 +26,27 @@ def fit_to_aspect_ratio(positions, aspect_ratio):
 
     return max_x - min_x, max_y - min_y
 
+def rotate_positions(positions, angle):
+    """rotate an (N, 2) array of positions. Multiples of 90 degrees are handled without trigonometry."""
+    a = angle % 360
+    if a == 0:
+        return positions.copy()
+    if a == 90:
+        return np.column_stack((-positions[:, 1], positions[:, 0]))
+    if a == 180:
+        return -positions
+    if a == 270:
+        return np.column_stack((positions[:, 1], -positions[:, 0]))
+    rad = np.radians(angle)
+    rotation_matrix = np.array([[np.cos(rad), -np.sin(rad)], [np.sin(rad), np.cos(rad)]])
+    return positions @ rotation_matrix.T
+
 def rotate_and_center_particles(data, angle, aspect_ratio, center_point):
     particles = data['particle_graph']['particles']
-    rotated_positions = [rotate_position(np.array(particle['position']), angle) for particle in particles if 'position' in particle]
+    raw_positions = np.array([particle['position'] for particle in particles if 'position' in particle], dtype=np.float64)
+    rotated_positions = rotate_positions(raw_positions, angle)
 
     bbox_width, bbox_height = fit_to_aspect_ratio(rotated_positions, aspect_ratio)
-    rotated_positions = np.array(rotated_positions)
     current_center = np.mean(rotated_positions, axis=0)
     translation_vector = center_point - current_center
     translated_positions = rotated_positions + translation_vector
@@ -46,24 +56,34 @@ def rotate_and_center_particles(data, angle, aspect_ratio, center_point):
 
     return translated_positions, (bbox_width, bbox_height)
 
-def update_positions_in_json(data, translated_positions):
-    particles = data['particle_graph']['particles']
-    for particle, pos in zip(particles, translated_positions):
-        if 'position' in particle:
-            particle['position'] = pos.tolist()
-
-def plot_particles_with_corrected_approach(data, translated_positions, bbox_size):
-    particles = data['particle_graph']['particles']
-
-    for particle, pos in zip(particles, translated_positions):
-        if 'position' in particle:
-            particle_type = particle['particle_type']
-            if particle_type == 'Particle_Node':
-                plt.scatter(pos[0], pos[1], c='black', marker='o', s=50)
-            elif particle_type == 'Particle_Label':
-                plt.scatter(pos[0], pos[1], c='blue', marker='s', s=30)
-            elif particle_type == 'Particle_Edge':
-                plt.scatter(pos[0], pos[1], c='grey', marker='x', s=20)
+def get_particles_with_position(data):
+    return [particle for particle in data['particle_graph']['particles'] if 'position' in particle]
+
+def update_positions_in_json(data, translated_positions, particles_with_position=None):
+    if particles_with_position is None:
+        particles_with_position = get_particles_with_position(data)
+    # convert all positions at once instead of calling .tolist() per particle
+    position_lists = translated_positions.tolist()
+    for particle, position in zip(particles_with_position, position_lists):
+        particle['position'] = position
+
+def plot_particles_with_corrected_approach(data, translated_positions, bbox_size, particles_with_position=None):
+    if particles_with_position is None:
+        particles_with_position = get_particles_with_position(data)
+
+    # one scatter call per particle type instead of one per particle
+    scatter_styles = {
+        'Particle_Node': dict(c='black', marker='o', s=50),
+        'Particle_Label': dict(c='blue', marker='s', s=30),
+        'Particle_Edge': dict(c='grey', marker='x', s=20),
+    }
+    indices_by_type = {particle_type: [] for particle_type in scatter_styles}
+    for i, particle in enumerate(particles_with_position):
+        if particle['particle_type'] in indices_by_type:
+            indices_by_type[particle['particle_type']].append(i)
+    for particle_type, indices in indices_by_type.items():
+        if indices:
+            plt.scatter(translated_positions[indices, 0], translated_positions[indices, 1], **scatter_styles[particle_type])
 
     rect = patches.Rectangle((0, 0), bbox_size[0], bbox_size[1], linewidth=1, edgecolor='r', facecolor='none')
     plt.gca().add_patch(rect)
@@ -88,9 +108,10 @@ def main():
 
     # Rotate and translate the positions
     translated_positions, bbox_size = rotate_and_center_particles(data, optimal_angle, aspect_ratio, center_point)
+    particles_with_position = get_particles_with_position(data)
 
     # Update the JSON data
-    update_positions_in_json(data, translated_positions)
+    update_positions_in_json(data, translated_positions, particles_with_position)
 
     # let user choose where to save the file, default: same name as input file
     new_filepath = asksaveasfilename(
@@ -103,7 +124,7 @@ def main():
         json.dump(data, file, indent=4)
 
     # Plot the particles
-    plot_particles_with_corrected_approach(data, translated_positions, bbox_size)
+    plot_particles_with_corrected_approach(data, translated_positions, bbox_size, particles_with_position)
 
 if __name__ == "__main__":
     main()
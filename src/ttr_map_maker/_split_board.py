@@ -9,15 +9,31 @@ Author: Sebastian Jost & ChatGPT
 
 import os
 import sys
+import io
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory
 from tkinter import Tk, filedialog
 
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.collections import PatchCollection, LineCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from PIL import Image
 from pylatex import Document, NoEscape, MiniPage, Command, Package
 
-from _task_card_pdf_generation import add_horizontal_crop_marks, add_vertical_crop_marks
+from _task_card_pdf_generation import get_horizontal_crop_marks_latex, get_vertical_crop_marks_latex
 
+# PNG deflate level for all saved image parts. Level 1 produces slightly larger files than the default (6) but encodes several times faster.
+PNG_SAVE_OPTIONS: dict = {"compress_level": 1, "optimize": False}
+# save options for the supported tile formats. Both can be included by pdflatex.
+# JPEG encodes much faster than PNG but is lossy; quality 95 without chroma subsampling is indistinguishable in print.
+TILE_SAVE_OPTIONS: dict[str, dict] = {
+    "png": {"format": "PNG", **PNG_SAVE_OPTIONS},
+    "jpg": {"format": "JPEG", "quality": 95, "subsampling": 0},
+}
 def split_image_into_4_parts(image_path, output_folder):
     """
     old version: basic splitting of an image into 4 parts
@@ -27,84 +43,116 @@ def split_image_into_4_parts(image_path, output_folder):
         print("File or output folder not selected. Exiting.")
         return
 
-    # Load the image
-    original_image = Image.open(image_path)
+    # Load the image once; the parts are slices of the decoded pixel array
+    img_array = load_image_array(image_path)
 
     # Calculate dimensions for the split
-    width, height = original_image.size
+    height, width = img_array.shape[:2]
     center_x, center_y = width // 2, height // 2
 
     # Check for odd dimensions and calculate overlap if needed
     overlap_x = width % 2
     overlap_y = height % 2
 
-    # Define the coordinates for the 4 parts
-    top_left = (0, 0, center_x + overlap_x, center_y + overlap_y)
-    top_right = (center_x, 0, width, center_y + overlap_y)
-    bottom_left = (0, center_y, center_x + overlap_x, height)
-    bottom_right = (center_x, center_y, width, height)
-
-    # Crop the image into four parts
-    top_left_part = original_image.crop(top_left)
-    top_right_part = original_image.crop(top_right)
-    bottom_left_part = original_image.crop(bottom_left)
-    bottom_right_part = original_image.crop(bottom_right)
+    # Define the 4 parts as array slices
+    parts = {
+        'top_left': img_array[:center_y + overlap_y, :center_x + overlap_x],
+        'top_right': img_array[:center_y + overlap_y, center_x:],
+        'bottom_left': img_array[center_y:, :center_x + overlap_x],
+        'bottom_right': img_array[center_y:, center_x:],
+    }
 
     # Save each part to a separate file
-    top_left_part.save(os.path.join(output_folder, 'top_left.png'))
-    top_right_part.save(os.path.join(output_folder, 'top_right.png'))
-    bottom_left_part.save(os.path.join(output_folder, 'bottom_left.png'))
-    bottom_right_part.save(os.path.join(output_folder, 'bottom_right.png'))
+    for part_name, part in parts.items():
+        Image.fromarray(part).save(os.path.join(output_folder, f'{part_name}.png'), **PNG_SAVE_OPTIONS)
 
     print("The image has been split and saved to the output folder.")
 
-def add_fullpage_image(
-        doc: Document,
-        x_pos: float,
-        y_pos: float,
-        image_path: str,
-        tile_width: float = 88.9,
-        tile_height: float = 63.5,):
+def load_image_array(image_path: str, draft_size: tuple[int, int] = None) -> np.ndarray:
     """
-    Adds a single image (front and back) to the given LaTeX document.
+    Decode an image file into a NumPy array of shape (height, width[, channels]).
+    Palette and other uncommon image modes are converted to RGBA.
+    Full boards at print resolution are far larger than PIL's decompression bomb limit, so the limit is lifted while decoding and restored afterwards.
 
     Args:
-        doc (Document): The LaTeX document.
-        front_path (str): File path to the front image.
-        back_path (str): File path to the back image.
-        flip_backside (bool): Whether to flip the back image.
-        card_width (float): Width of the card in mm.
-        card_height (float): Height of the card in mm.
-        gap (float): Gap between front and back in mm.
-        vspace (float): Vertical space between cards in mm.
+        image_path (str): path to the image file
+        draft_size (tuple[int, int], optional): if given, JPEG images are decoded at a reduced scale that is at least this size (see `Image.draft`). Other formats are always decoded at full size. Only use this for previews. Defaults to None.
+
+    Returns:
+        np.ndarray: decoded pixel array
     """
-    
-    # Start tikzpicture for precise image placement
-    doc.append(NoEscape(r'\begin{tikzpicture}[overlay, remember picture]'))
+    max_image_pixels = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        img = Image.open(image_path)
+        if draft_size is not None:
+            img.draft("RGB", draft_size)
+        img.load()
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_image_pixels
+    if img.mode not in ("L", "RGB", "RGBA"): # e.g. palette images can't be sliced as arrays directly
+        img = img.convert("RGBA")
+    return np.asarray(img)
+
+@lru_cache(maxsize=None)
+def _get_fullpage_image_template(
+        x_pos: float,
+        y_pos: float,
+        tile_width: float,
+        tile_height: float) -> tuple[str, str]:
+    """
+    Build the LaTeX code for one full page image with crop marks, split around the image path.
+    Everything except the image path only depends on position and size, so the code is built once per tile size and cached.
 
+    Returns:
+        str: LaTeX code before the image path
+        str: LaTeX code after the image path
+    """
     # Place the image at the specified location with rotation if needed
     if tile_width > tile_height:
         x_shift = x_pos + tile_height / 2
         y_shift = y_pos + tile_width / 2
-        doc.append(NoEscape(
-            f'\\node[anchor=center,rotate=-90] at ([xshift={x_shift}mm,yshift=-{y_shift}mm]current page.north west) '
-            f'{{\\includegraphics[height={tile_height}mm,width={tile_width}mm,keepaspectratio=FALSE]{{{image_path}}}}};'
-        ))
+        node_options = "anchor=center,rotate=-90"
     else:
         x_shift = x_pos + tile_width / 2
         y_shift = y_pos + tile_height / 2
-        doc.append(NoEscape(
-            f'\\node[anchor=center] at ([xshift={x_shift}mm,yshift=-{y_shift}mm]current page.north west) '
-            f'{{\\includegraphics[height={tile_height}mm,width={tile_width}mm,keepaspectratio=FALSE]{{{image_path}}}}};'
-        ))
-
-
-    # End tikzpicture
-    doc.append(NoEscape(r'\end{tikzpicture}'))
+        node_options = "anchor=center"
+    prefix = "\n".join((
+        # tikzpicture for precise image placement
+        r'\begin{tikzpicture}[overlay, remember picture]',
+        f'\\node[{node_options}] at ([xshift={x_shift}mm,yshift=-{y_shift}mm]current page.north west) '
+        f'{{\\includegraphics[height={tile_height}mm,width={tile_width}mm,keepaspectratio=FALSE]{{',
+    ))
+    suffix = "\n".join((
+        '}};',
+        r'\end{tikzpicture}',
+        # crop marks
+        get_horizontal_crop_marks_latex(x_pos, y_pos, tile_width, tile_height),
+        get_vertical_crop_marks_latex(x_pos, y_pos, tile_width, tile_height),
+    ))
+    return prefix, suffix
+
+def get_fullpage_image_latex(
+        x_pos: float,
+        y_pos: float,
+        image_path: str,
+        tile_width: float = 88.9,
+        tile_height: float = 63.5,) -> str:
+    """
+    Returns the LaTeX code placing a single image with crop marks as one string.
 
-    # Add crop marks
-    add_horizontal_crop_marks(doc, x_pos, y_pos, tile_width, tile_height)
-    add_vertical_crop_marks(doc, x_pos, y_pos, tile_width, tile_height)
+    Args:
+        x_pos (float): x position of the top left corner of the image in mm.
+        y_pos (float): y position of the top left corner of the image in mm.
+        image_path (str): File path to the image.
+        tile_width (float): Width of the image in mm.
+        tile_height (float): Height of the image in mm.
+
+    Returns:
+        str: LaTeX code for the image and its crop marks
+    """
+    prefix, suffix = _get_fullpage_image_template(x_pos, y_pos, tile_width, tile_height)
+    return prefix + image_path + suffix
 
 
 def calculate_cut_lines_and_tiles(
@@ -114,7 +162,7 @@ def calculate_cut_lines_and_tiles(
         total_board_height: float = 589, # in mm
         outer_margin: float = 5, # in mm
         inner_margin: float = 1 # in mm
-    ) -> tuple[list[tuple[float, float, float, float]], list[float], list[float]]:
+    ) -> tuple[np.ndarray, list[float], list[float]]:
     # Calculate tile widths and heights
     tile_widths = [total_board_width / tile_columns - 2 * inner_margin] * tile_columns
     tile_heights = [total_board_height / tile_rows - 2 * inner_margin] * tile_rows
@@ -124,130 +172,264 @@ def calculate_cut_lines_and_tiles(
     tile_heights[0] -= outer_margin - inner_margin
     tile_heights[-1] -= outer_margin - inner_margin
 
-    tiles = [] # list of bboxes as (left, bottom, width, height)
-    vertical_cut_lines = []
-    horizontal_cut_lines = []
-    
-    for i in range(tile_columns):
-        for j in range(tile_rows):
-            x = outer_margin + sum(tile_widths[:i]) + 2 * i * inner_margin
-            y = outer_margin + sum(tile_heights[:j]) + 2 * j * inner_margin
-            tile = (x, y, tile_widths[i], tile_heights[j])
-            tiles.append(tile)
-    
-    for i in range(1, tile_columns):
-        cut_x = outer_margin + sum(tile_widths[:i]) + (2 * i - 1) * inner_margin
-        vertical_cut_lines.append(cut_x)
-    
-    for j in range(1, tile_rows):
-        cut_y = outer_margin + sum(tile_heights[:j]) + (2 * j - 1) * inner_margin
-        horizontal_cut_lines.append(cut_y)
+    # prefix sums: cum_widths[i] == sum(tile_widths[:i])
+    cum_widths = np.concatenate(([0], np.cumsum(tile_widths)))
+    cum_heights = np.concatenate(([0], np.cumsum(tile_heights)))
+
+    # tile positions along each axis, combined into a grid of bboxes (column-major, like the tile filenames)
+    tile_x = outer_margin + cum_widths[:tile_columns] + 2 * np.arange(tile_columns) * inner_margin
+    tile_y = outer_margin + cum_heights[:tile_rows] + 2 * np.arange(tile_rows) * inner_margin
+    grid_x, grid_y = np.meshgrid(tile_x, tile_y, indexing='ij')
+    grid_w, grid_h = np.meshgrid(tile_widths, tile_heights, indexing='ij')
+    # (N, 4) array of bboxes as rows (left, bottom, width, height)
+    tiles = np.stack([grid_x, grid_y, grid_w, grid_h], axis=-1).reshape(-1, 4)
+
+    cut_indices_x = np.arange(1, tile_columns)
+    vertical_cut_lines = (outer_margin + cum_widths[1:tile_columns] + (2 * cut_indices_x - 1) * inner_margin).tolist()
+    cut_indices_y = np.arange(1, tile_rows)
+    horizontal_cut_lines = (outer_margin + cum_heights[1:tile_rows] + (2 * cut_indices_y - 1) * inner_margin).tolist()
     
     return tiles, horizontal_cut_lines, vertical_cut_lines
 
 def plot_tiles_and_cut_lines(
         image_path: str,
-        tile_bboxes: list[tuple[float, float, float, float]],
+        tile_bboxes: np.ndarray,
         horizontal_cut_lines: list[float],
         vertical_cut_lines: list[float],
         total_board_width: float,
         total_board_height: float,
+        img_array: np.ndarray = None,
+        outer_margin: float = None,
+        interactive: bool = True,
+        preview_path: str = None,
     ):
     """
     Given an image and the bounding boxes of tiles and cut lines plot all on a board of the given site to visualize tiles and cut lines
 
     Args:
-        image_path (str): 
-        tile_bboxes (list[tuple[float, float, float, float]]): 
+        image_path (str): path to the board image. Ignored if `img_array` is given.
+        tile_bboxes (np.ndarray): (N, 4) array of tile bboxes as rows (left, bottom, width, height) in mm
         horizontal_cut_lines (list[float]): 
         vertical_cut_lines (list[float]): 
         total_board_width (float): 
         total_board_height (float): 
+        img_array (np.ndarray, optional): already decoded board image. Defaults to None (decode `image_path`).
+        outer_margin (float, optional): outer margin of the board in mm. Defaults to None (use position of the first tile).
+        interactive (bool, optional): whether to show the plot in a window. If False, the plot is rendered with the Agg backend and saved to `preview_path`. Defaults to True.
+        preview_path (str, optional): filepath to save the preview to if `interactive` is False. Defaults to None.
     """
-    # Open the image
-    img = Image.open(image_path)
-    
+    if not interactive and preview_path is None:
+        raise ValueError("A preview_path is required for non-interactive previews.")
     # Create figure and axes
-    fig, ax = plt.subplots(1)
+    if interactive:
+        fig, ax = plt.subplots(1)
+    else: # render off-screen without any GUI backend
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.subplots(1)
+    # downsample the image for the preview. More than ~2 image pixels per screen pixel are never visible.
+    max_preview_width = int(fig.get_size_inches()[0] * fig.dpi * 2)
+    # Open the image. JPEGs are decoded at reduced resolution directly
+    if img_array is not None:
+        img = img_array
+    else:
+        img = load_image_array(image_path, draft_size=(max_preview_width, 1)) # only the width limits the preview size
+    img_height, img_width = img.shape[:2]
+    if img_width > max_preview_width:
+        preview_img = Image.fromarray(img)
+        preview_img.thumbnail(
+            (max_preview_width, max(1, int(max_preview_width * img_height / img_width))),
+            Image.Resampling.BILINEAR)
+        img = np.asarray(preview_img)
     
     # Draw the total board size rectangle
     total_rect = patches.Rectangle((0, 0), total_board_width, total_board_height, linewidth=1, edgecolor='b', facecolor='none')
     ax.add_patch(total_rect)
     
-    # Plot rectangles for tiles
-    min_x, min_y, max_x, max_y = float("inf"), float("inf"), float("-inf"), float("-inf")
-    for tile in tile_bboxes:
-        x, y, w, h = tile
-        if x < min_x:
-            min_x = x
-        if y < min_y:
-            min_y = y
-        if x + w > max_x:
-            max_x = x + w
-        if y + h > max_y:
-            max_y = y + h
-        patch = patches.Rectangle((x, y), w, h, linewidth=1, edgecolor='r', facecolor='none')
-        ax.add_patch(patch)
+    # Plot rectangles for tiles (collected into a single PatchCollection)
+    tile_rects = [patches.Rectangle((x, y), w, h) for x, y, w, h in tile_bboxes.tolist()]
+    ax.add_collection(PatchCollection(tile_rects, linewidth=1, edgecolor='r', facecolor='none'))
     
-    # Get image extent as min and max in rectangles
-    img_extent = [min_x, max_x, min_y, max_y] # (left, right, bottom, top)
+    # By construction, the tiles cover the board except for the outer margin
+    if outer_margin is None:
+        outer_margin = tile_bboxes[0][0]
+    img_extent = [outer_margin, total_board_width - outer_margin, outer_margin, total_board_height - outer_margin] # (left, right, bottom, top)
     ax.imshow(img, extent=img_extent)
     
-    # Draw cut lines for inner margins
-    for cut_x in vertical_cut_lines:  # vertical cut lines
-        ax.axvline(x=cut_x, color='g', linestyle='--')
-    
-    for cut_y in horizontal_cut_lines:  # horizontal cut lines
-        ax.axhline(y=cut_y, color='g', linestyle='--')
+    # Draw cut lines for inner margins (collected into a single LineCollection)
+    cut_segments = [[(cut_x, 0), (cut_x, total_board_height)] for cut_x in vertical_cut_lines] \
+        + [[(0, cut_y), (total_board_width, cut_y)] for cut_y in horizontal_cut_lines]
+    ax.add_collection(LineCollection(cut_segments, colors='g', linestyles='--'))
     
     # Set limits and aspect ratio
     ax.set_xlim(-2, total_board_width+2)
     ax.set_ylim(-2, total_board_height+2)
     ax.set_aspect('equal')
     
-    plt.show()
+    if interactive:
+        plt.show()
+    else:
+        fig.savefig(preview_path, dpi=100)
+
+def get_tile_pixel_rects(
+        tiles: np.ndarray,
+        scale_x: float,
+        scale_y: float,
+        offset_x: float,
+        offset_y: float) -> np.ndarray:
+    """
+    Convert tile bboxes in mm to pixel rectangles for all tiles at once.
+
+    Args:
+        tiles (np.ndarray): (N, 4) array of tile bboxes as rows (left, bottom, width, height) in mm
+        scale_x (float): pixels per mm in x direction
+        scale_y (float): pixels per mm in y direction
+        offset_x (float): x position of the image's left edge in mm
+        offset_y (float): y position of the image's top edge in mm
+
+    Returns:
+        np.ndarray: (N, 4) int array of pixel rectangles (left, upper, right, lower)
+    """
+    tiles = np.asarray(tiles, dtype=np.float64).reshape(-1, 4)
+    x = tiles[:, 0] - offset_x
+    y = tiles[:, 1] - offset_y
+    # truncate to int like `int()` (all values are non-negative)
+    return np.stack([
+        x * scale_x,
+        y * scale_y,
+        (x + tiles[:, 2]) * scale_x,
+        (y + tiles[:, 3]) * scale_y,
+    ], axis=1).astype(np.int64)
+
+def _save_tile(tile_array: np.ndarray, filepath: str | io.BytesIO, file_format: str = "png") -> None:
+    """
+    Save a single tile in the given file format (see `TILE_SAVE_OPTIONS`).
+
+    Args:
+        tile_array (np.ndarray): pixels of the tile
+        filepath (str | io.BytesIO): output filepath or in-memory buffer
+        file_format (str, optional): "png" or "jpg". Defaults to "png".
+    """
+    # copy the tile explicitly once into a contiguous block for encoding
+    tile_img = Image.fromarray(np.ascontiguousarray(tile_array))
+    if file_format == "jpg" and tile_img.mode == "RGBA": # JPEG has no alpha channel
+        tile_img = tile_img.convert("RGB")
+    tile_img.save(filepath, **TILE_SAVE_OPTIONS[file_format])
+
+def _encode_tile(args) -> tuple[str, bytes]:
+    """
+    Encode one tile of an image stored in shared memory into an in-memory file. Runs in a worker process of `export_sub_images`, writing to disk is left to the main process.
+
+    Args:
+        args (tuple): (shared memory name, array shape, array dtype, (left, upper, right, lower) pixel rectangle, output filepath, file format)
+
+    Returns:
+        str: filepath the tile should be saved to
+        bytes: encoded tile
+    """
+    shm_name, shape, dtype, (left, upper, right, lower), filepath, file_format = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = io.BytesIO()
+    try:
+        img_array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        _save_tile(img_array[upper:lower, left:right], buffer, file_format)
+        # release all views of the shared buffer before closing it
+        del img_array
+    finally:
+        shm.close()
+    return filepath, buffer.getvalue()
+
+def _write_file(filepath: str, data: bytes) -> str:
+    """
+    Write encoded data to a file.
+
+    Returns:
+        str: filepath of the written file
+    """
+    with open(filepath, "wb") as file:
+        file.write(data)
+    return filepath
 
 def export_sub_images(
         image_path: str,
         output_folder: str,
-        tiles,
+        tiles: np.ndarray,
+        tile_columns: int,
+        tile_rows: int,
         total_board_width,
         total_board_height,
         outer_margin: float,
-        output_prefix='cut') -> list[str]:
-    img = Image.open(image_path)
-    img_width, img_height = img.size
-    tile_columns = len(set([x for x, *_ in tiles]))
-    tile_rows = len(set([y for _, y, *_ in tiles]))
+        output_prefix='cut',
+        n_workers: int = None,
+        img_array: np.ndarray = None,
+        file_format: str = "png") -> list[str]:
+    """
+    Cut the board image into tiles and save each tile as a separate image. Tiles are encoded in parallel by `n_workers` processes.
+
+    Args:
+        tiles (np.ndarray): (N, 4) array of tile bboxes in column-major order as returned by `calculate_cut_lines_and_tiles`
+        tile_columns (int): number of tile columns
+        tile_rows (int): number of tile rows
+        img_array (np.ndarray, optional): already decoded board image. Defaults to None (decode `image_path`).
+        n_workers (int, optional): number of worker processes used to encode tiles. Defaults to None (number of CPU cores - 2, leaving some cores for disk I/O).
+        file_format (str, optional): file format of the tiles, "png" (lossless) or "jpg" (lossy, but much faster to encode). Defaults to "png".
+
+    Returns:
+        list[str]: filepaths of the saved tiles
+    """
+    if file_format not in TILE_SAVE_OPTIONS:
+        raise ValueError(f"Unsupported tile format '{file_format}'. Use one of {list(TILE_SAVE_OPTIONS.keys())}.")
+    # decode the image once and slice tiles from the pixel array
+    if img_array is None:
+        img_array = load_image_array(image_path)
+    img_height, img_width = img_array.shape[:2]
     # convert mm to pixels
     scale_x = img_width / (total_board_width - 2*outer_margin)
     scale_y = img_height / (total_board_height - 2*outer_margin)
     
-    first_rect_x: float = tiles[0][0]
-    first_rect_y: float = tiles[0][1]
+    first_rect_x: float = tiles[0, 0]
+    first_rect_y: float = tiles[0, 1]
     
+    tile_rects = [tuple(rect) for rect in get_tile_pixel_rects(tiles, scale_x, scale_y, first_rect_x, first_rect_y).tolist()]
     image_paths = []
-    for idx, tile in enumerate(tiles):
-        x, y, w, h = tile
-        x -= first_rect_x
-        y -= first_rect_y
-        left = int(x * scale_x)
-        upper = int(y * scale_y)
-        right = int((x + w) * scale_x)
-        lower = int((y + h) * scale_y)
-        
-        cropped_img = img.crop((left, upper, right, lower))
-        filename = f"{output_prefix}_{idx%tile_columns+1}_{idx//tile_rows+1}.png"
-        filepath = os.path.join(output_folder, filename)
-        image_paths.append(filepath)
-        cropped_img.save(filepath)
-        print(f"Saved sub-image {filename} to {output_folder}")
+    for idx in range(len(tiles)):
+        # tiles are ordered column by column: name files as <prefix>_<row>_<column>
+        filename = f"{output_prefix}_{idx%tile_rows+1}_{idx//tile_rows+1}.{file_format}"
+        image_paths.append(os.path.join(output_folder, filename))
+
+    if n_workers is None:
+        n_workers = max(1, (os.cpu_count() or 1) - 2)
+    n_workers = min(n_workers, len(tiles))
+    if n_workers <= 1:
+        for (left, upper, right, lower), filepath in zip(tile_rects, image_paths):
+            _save_tile(img_array[upper:lower, left:right], filepath, file_format)
+            print(f"Saved sub-image {os.path.basename(filepath)} to {output_folder}")
+        return image_paths
+
+    # copy the decoded image into shared memory once so worker processes can slice it without pickling the pixels
+    shm = shared_memory.SharedMemory(create=True, size=img_array.nbytes)
+    try:
+        shared_array = np.ndarray(img_array.shape, dtype=img_array.dtype, buffer=shm.buf)
+        shared_array[:] = img_array
+        del shared_array
+        task_list = [
+            (shm.name, img_array.shape, img_array.dtype, tile_rect, filepath, file_format)
+            for tile_rect, filepath in zip(tile_rects, image_paths)]
+        # worker processes encode tiles while a writer thread saves finished tiles to disk
+        with ProcessPoolExecutor(max_workers=n_workers) as encoder, ThreadPoolExecutor(max_workers=2) as writer:
+            encode_futures = [encoder.submit(_encode_tile, task) for task in task_list]
+            write_futures = [writer.submit(_write_file, *future.result()) for future in as_completed(encode_futures)]
+            for future in as_completed(write_futures):
+                print(f"Saved sub-image {os.path.basename(future.result())} to {output_folder}")
+    finally:
+        shm.close()
+        shm.unlink()
 
     return image_paths
 
 def generate_board_latex(
         image_paths: list[str],
-        tile_bboxes: list[tuple[float, float, float, float]],
+        tile_bboxes: np.ndarray,
         target_filepath: str,
         border: tuple[float, float] = (10, 10),
     ):
@@ -265,17 +447,18 @@ def generate_board_latex(
     x_pos = border[0]
     y_pos = border[1]
     
-    for tile, image_path in zip(tile_bboxes, image_paths):
+    # collect the LaTeX code of all pages and add it to the document at once
+    pages = []
+    for tile, image_path in zip(tile_bboxes.tolist(), image_paths):
         image_path: str = image_path.replace("\\", "/")
-        add_fullpage_image(
-            doc=doc,
+        pages.append(get_fullpage_image_latex(
             x_pos=x_pos,
             y_pos=y_pos,
             image_path=image_path,
             tile_width=tile[2],
             tile_height=tile[3]
-        )
-        doc.append(NoEscape(r'\newpage'))
+        ))
+    doc.append(NoEscape("\n\\newpage\n".join(pages) + "\n\\newpage"))
     # Output as .tex file
     target_filepath_stripped = target_filepath[:-4] if ".tex" in target_filepath else target_filepath
     doc.generate_tex(target_filepath_stripped)
@@ -334,6 +517,8 @@ def main(
         outer_margin = outer_margin, # in mm
         inner_margin = inner_margin # in mm
     )
+    # decode the board image once for preview and export
+    img_array = load_image_array(image_path) if not image_paths else None
     # plot_tiles_and_cut_lines(
     #     image_path,
     #     tile_bboxes,
@@ -341,16 +526,21 @@ def main(
     #     vert_cuts,
     #     total_board_width = total_board_width,
     #     total_board_height = total_board_height,
+    #     img_array = img_array,
+    #     outer_margin = outer_margin,
     # )
     if not image_paths:
         image_paths = export_sub_images(
             image_path,
             output_folder,
             tile_bboxes,
+            tile_columns,
+            tile_rows,
             total_board_width,
             total_board_height,
             outer_margin=outer_margin,
-            output_prefix=output_prefix
+            output_prefix=output_prefix,
+            img_array=img_array,
         )
     generate_board_latex(
         image_paths=image_paths,
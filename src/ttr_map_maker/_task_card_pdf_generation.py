@@ -1,43 +1,52 @@
 from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import os
+import shutil
+import subprocess
 import tkinter as tk
 from tkinter import filedialog
 
+from PIL import Image
 from pylatex import Document, NoEscape, MiniPage, Command, Package
 
-def add_horizontal_crop_marks(
-        doc: Document,
+# name of the LaTeX box holding the card back image shared by all cards
+CARD_BACK_BOX = r"\cardback"
+
+def get_horizontal_crop_marks_latex(
         x_pos: float = 0.0,
         y_pos: float = 0.0,
         content_height: float = 65.0,
         content_width: float = 91.0,
-        crop_mark_length: float = 5.0):
+        crop_mark_length: float = 5.0) -> str:
     """
-    Adds horizontal crop marks for one card to the document.
+    Returns the LaTeX code for horizontal crop marks of one card as a single string.
 
     Args:
-        doc (Document): The LaTeX document.
         crop_mark_length (float): Length of the crop marks in mm.
+
+    Returns:
+        str: LaTeX code of a tikzpicture with the crop marks
     """
     # Calculate positions for horizontal crop marks (top and bottom of the card)
     top_y_pos = y_pos
     bottom_y_pos = y_pos + content_height
     left_x_pos = x_pos - 1
     right_x_pos = x_pos + content_width + 1
-    # begin tikzpicture
-    doc.append(NoEscape(r'\begin{tikzpicture}[overlay, remember picture]'))
-    # Top left horizontal crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={left_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++(-{crop_mark_length}mm,0); % top left horizontal"))
-    # Top right horizontal crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={right_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++({crop_mark_length}mm,0); % top right horizontal"))
-    # Bottom left horizontal crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={left_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++(-{crop_mark_length}mm,0); % bottom left horizontal"))
-    # Bottom right horizontal crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={right_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++({crop_mark_length}mm,0); % bottom right horizontal"))
-    # end tikzpicture
-    doc.append(NoEscape(r'\end{tikzpicture}'))
+    return "\n".join((
+        r'\begin{tikzpicture}[overlay, remember picture]',
+        # Top left horizontal crop mark
+        f"\\draw ([xshift={left_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++(-{crop_mark_length}mm,0); % top left horizontal",
+        # Top right horizontal crop mark
+        f"\\draw ([xshift={right_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++({crop_mark_length}mm,0); % top right horizontal",
+        # Bottom left horizontal crop mark
+        f"\\draw ([xshift={left_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++(-{crop_mark_length}mm,0); % bottom left horizontal",
+        # Bottom right horizontal crop mark
+        f"\\draw ([xshift={right_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++({crop_mark_length}mm,0); % bottom right horizontal",
+        r'\end{tikzpicture}',
+    ))
 
-def add_vertical_crop_marks(
+def add_horizontal_crop_marks(
         doc: Document,
         x_pos: float = 0.0,
         y_pos: float = 0.0,
@@ -45,36 +54,90 @@ def add_vertical_crop_marks(
         content_width: float = 91.0,
         crop_mark_length: float = 5.0):
     """
-    Adds vertical crop marks for one page of cards to the document.
-    
+    Adds horizontal crop marks for one card to the document.
+
     Args:
         doc (Document): The LaTeX document.
+        crop_mark_length (float): Length of the crop marks in mm.
+    """
+    doc.append(NoEscape(get_horizontal_crop_marks_latex(x_pos, y_pos, content_height, content_width, crop_mark_length)))
+
+def get_vertical_crop_marks_latex(
+        x_pos: float = 0.0,
+        y_pos: float = 0.0,
+        content_height: float = 65.0,
+        content_width: float = 91.0,
+        crop_mark_length: float = 5.0) -> str:
+    """
+    Returns the LaTeX code for vertical crop marks of one page of cards as a single string.
+    
+    Args:
         x_pos (float): x position of the top left corner of the top card in mm.
         y_pos (float): y coordinate of the top left corner of the top card in mm.
         content_height (float): Height of the combined cards in mm.
         content_width (float): Width of the combined cards in mm.
         crop_mark_length (float): Length of the crop marks in mm.
+
+    Returns:
+        str: LaTeX code of a tikzpicture with the crop marks
     """
     # Calculate positions for vertical crop marks (left and right of the card)
     top_y_pos = y_pos - 1
     bottom_y_pos = y_pos + content_height + 1
     left_x_pos = x_pos
     right_x_pos = x_pos + content_width
-    # begin tikzpicture
-    doc.append(NoEscape(r'\begin{tikzpicture}[overlay, remember picture]'))
-    # Top left vertical crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={left_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++(0,{crop_mark_length}mm); % top left vertical"))
-    # Top right vertical crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={right_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++(0,{crop_mark_length}mm); % top right vertical"))
-    # Bottom left vertical crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={left_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++(0,-{crop_mark_length}mm); % bottom left vertical"))
-    # Bottom right vertical crop mark
-    doc.append(NoEscape(f"\\draw ([xshift={right_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++(0,-{crop_mark_length}mm); % bottom right vertical"))
-    # end tikzpicture
-    doc.append(NoEscape(r'\end{tikzpicture}'))
+    return "\n".join((
+        r'\begin{tikzpicture}[overlay, remember picture]',
+        # Top left vertical crop mark
+        f"\\draw ([xshift={left_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++(0,{crop_mark_length}mm); % top left vertical",
+        # Top right vertical crop mark
+        f"\\draw ([xshift={right_x_pos}mm,yshift=-{top_y_pos}mm]current page.north west) -- ++(0,{crop_mark_length}mm); % top right vertical",
+        # Bottom left vertical crop mark
+        f"\\draw ([xshift={left_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++(0,-{crop_mark_length}mm); % bottom left vertical",
+        # Bottom right vertical crop mark
+        f"\\draw ([xshift={right_x_pos}mm,yshift=-{bottom_y_pos}mm]current page.north west) -- ++(0,-{crop_mark_length}mm); % bottom right vertical",
+        r'\end{tikzpicture}',
+    ))
 
-def add_card(
+def add_vertical_crop_marks(
         doc: Document,
+        x_pos: float = 0.0,
+        y_pos: float = 0.0,
+        content_height: float = 65.0,
+        content_width: float = 91.0,
+        crop_mark_length: float = 5.0):
+    """
+    Adds vertical crop marks for one page of cards to the document.
+    
+    Args:
+        doc (Document): The LaTeX document.
+        x_pos (float): x position of the top left corner of the top card in mm.
+        y_pos (float): y coordinate of the top left corner of the top card in mm.
+        content_height (float): Height of the combined cards in mm.
+        content_width (float): Width of the combined cards in mm.
+        crop_mark_length (float): Length of the crop marks in mm.
+    """
+    doc.append(NoEscape(get_vertical_crop_marks_latex(x_pos, y_pos, content_height, content_width, crop_mark_length)))
+
+def get_card_back_box_latex(
+        back_path: str,
+        card_width: float = 88.9,
+        card_height: float = 63.5) -> str:
+    """
+    Returns the LaTeX code that stores the card back image in the box `CARD_BACK_BOX`. The image is then only embedded once in the pdf, no matter how many cards use it.
+
+    Args:
+        back_path (str): File path to the back image.
+        card_width (float): Width of the card in mm.
+        card_height (float): Height of the card in mm.
+
+    Returns:
+        str: LaTeX code declaring and filling the box
+    """
+    return (f"\\newsavebox{{{CARD_BACK_BOX}}}%\n"
+            f"\\sbox{{{CARD_BACK_BOX}}}{{\\includegraphics[height={card_height}mm,width={card_width}mm,keepaspectratio=FALSE]{{{back_path}}}}}")
+
+def get_card_latex(
         x_pos: float,
         y_pos: float,
         front_path: str,
@@ -83,12 +146,12 @@ def add_card(
         card_width: float = 88.9,
         card_height: float = 63.5,
         gap: float = 0.1,
-        vspace: float = 2.0):
+        vspace: float = 2.0,
+        back_box: bool = False) -> str:
     """
-    Adds a single card (front and back) to the document.
+    Returns the LaTeX code for a single card (front and back) as a single string.
 
     Args:
-        doc (Document): The LaTeX document.
         front_path (str): File path to the front image.
         back_path (str): File path to the back image.
         flip_backside (bool): Whether to flip the back image.
@@ -96,38 +159,61 @@ def add_card(
         card_height (float): Height of the card in mm.
         gap (float): Gap between front and back in mm.
         vspace (float): Vertical space between cards in mm.
-    """# Start tikzpicture for precise image placement
-    doc.append(NoEscape(r'\begin{tikzpicture}[overlay, remember picture]'))
+        back_box (bool): Whether to use the back image stored by `get_card_back_box_latex` instead of including `back_path` again.
 
+    Returns:
+        str: LaTeX code of a tikzpicture with both images followed by the vertical space
+    """
     # Adjust shifts to correct the positioning for the back image
     x_shift_back = x_pos + card_width / 2
     y_shift_back = y_pos + card_height / 2
-
-    if flip_backside:
-        doc.append(NoEscape(
-            f'\\node[anchor=center,rotate=180] at ([xshift={x_shift_back}mm,yshift=-{y_shift_back}mm]current page.north west) '
-            f'{{\\includegraphics[height={card_height}mm,width={card_width}mm,keepaspectratio=FALSE]{{{back_path}}}}};'
-        ))
+    rotate_option = ",rotate=180" if flip_backside else ""
+    if back_box:
+        back_image = f"\\usebox{{{CARD_BACK_BOX}}}"
     else:
-        doc.append(NoEscape(
-            f'\\node[anchor=center] at ([xshift={x_shift_back}mm,yshift=-{y_shift_back}mm]current page.north west) '
-            f'{{\\includegraphics[height={card_height}mm,width={card_width}mm,keepaspectratio=FALSE]{{{back_path}}}}};'
-        ))
-
+        back_image = f"\\includegraphics[height={card_height}mm,width={card_width}mm,keepaspectratio=FALSE]{{{back_path}}}"
     # Adjust shifts to correct the positioning for the front image
     x_shift_front = x_pos + card_width + gap + card_width / 2
     y_shift_front = y_pos + card_height / 2
 
-    doc.append(NoEscape(
+    tikzpicture = "\n".join((
+        # Start tikzpicture for precise image placement
+        r'\begin{tikzpicture}[overlay, remember picture]',
+        f'\\node[anchor=center{rotate_option}] at ([xshift={x_shift_back}mm,yshift=-{y_shift_back}mm]current page.north west) '
+        f'{{{back_image}}};',
         f'\\node[anchor=center] at ([xshift={x_shift_front}mm,yshift=-{y_shift_front}mm]current page.north west) '
-        f'{{\\includegraphics[height={card_height}mm,width={card_width}mm,keepaspectratio=FALSE]{{{front_path}}}}};'
+        f'{{\\includegraphics[height={card_height}mm,width={card_width}mm,keepaspectratio=FALSE]{{{front_path}}}}};',
+        r'\end{tikzpicture}',
     ))
+    # Vertical space between cards
+    return f"{tikzpicture}%\n\\vspace{{{vspace}mm}}"
 
-    # End tikzpicture
-    doc.append(NoEscape(r'\end{tikzpicture}'))
+def add_card(
+        doc: Document,
+        x_pos: float,
+        y_pos: float,
+        front_path: str,
+        back_path: str,
+        flip_backside: bool = False,
+        card_width: float = 88.9,
+        card_height: float = 63.5,
+        gap: float = 0.1,
+        vspace: float = 2.0):
+    """
+    Adds a single card (front and back) to the document.
 
-    # Vertical space between cards
-    doc.append(NoEscape(f'\\vspace{{{vspace}mm}}'))
+    Args:
+        doc (Document): The LaTeX document.
+        front_path (str): File path to the front image.
+        back_path (str): File path to the back image.
+        flip_backside (bool): Whether to flip the back image.
+        card_width (float): Width of the card in mm.
+        card_height (float): Height of the card in mm.
+        gap (float): Gap between front and back in mm.
+        vspace (float): Vertical space between cards in mm.
+    """
+    doc.append(NoEscape(get_card_latex(
+        x_pos, y_pos, front_path, back_path, flip_backside, card_width, card_height, gap, vspace)))
 
 def generate_latex_document(
         fronts: List[str], 
@@ -164,10 +250,12 @@ def generate_latex_document(
 
     y_pos = border[0]
     x_pos = border[1]
+    # collect the LaTeX code of all pages and add it to the document at once
+    # the back image is the same for all cards, so it is loaded once and reused
+    parts = [get_card_back_box_latex(back, card_width=card_width, card_height=card_height)]
     for i, front in enumerate(fronts):
-        doc.append(NoEscape(r'\noindent'))
-        add_card(
-            doc,
+        parts.append(r'\noindent')
+        parts.append(get_card_latex(
             x_pos=x_pos,
             y_pos=y_pos,
             front_path=front,
@@ -176,42 +264,100 @@ def generate_latex_document(
             card_width=card_width,
             card_height=card_height,
             gap=gap,
-            vspace=vspace)
-        add_horizontal_crop_marks(
-            doc,
+            vspace=vspace,
+            back_box=True))
+        parts.append(get_horizontal_crop_marks_latex(
             x_pos=x_pos,
             y_pos=y_pos,
             content_height=card_height,
             content_width=2*card_width + gap,
-            crop_mark_length=crop_mark_length)
+            crop_mark_length=crop_mark_length))
         y_pos += card_height
         if not i == len(fronts) - 1:
             y_pos += vspace
         if i % 4 != 3: # add linebreak between cards
-            doc.append(NoEscape(r'\\'))
+            parts.append(r'\\')
         if i % 4 == 3 or i == len(fronts) - 1:
-            add_vertical_crop_marks(
-                doc,
+            parts.append(get_vertical_crop_marks_latex(
                 x_pos=x_pos,
                 y_pos=border[0],
                 content_height=y_pos - border[0],
                 content_width=2*card_width + gap,
-                crop_mark_length=crop_mark_length)
+                crop_mark_length=crop_mark_length))
             if i != len(fronts) - 1:
-                doc.append(NoEscape(r'\newpage'))
+                parts.append(r'\newpage')
                 y_pos = border[0]
+    # join like pylatex joins separately appended elements
+    doc.append(NoEscape("%\n".join(parts)))
     # Output as .tex file
     target_filepath_stripped = target_filepath.strip(".tex")
     doc.generate_tex(target_filepath_stripped)
     return doc, target_filepath
 
+def compile_latex(filepath: str, compiler: str = "pdflatex"):
+    """
+    Compiles an existing .tex file to pdf and removes the auxiliary files created by the compiler.
+
+    Args:
+        filepath (str): Path of the .tex file without extension.
+        compiler (str, optional): LaTeX compiler to use. Defaults to "pdflatex".
+    """
+    filepath = os.path.abspath(filepath)
+    try:
+        subprocess.run(
+            [compiler, "--interaction=nonstopmode", filepath + ".tex"],
+            cwd=os.path.dirname(filepath),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            check=True)
+    except subprocess.CalledProcessError as e:
+        print(e.output.decode())
+        raise
+    for ext in ("aux", "log", "out"):
+        if os.path.exists(f"{filepath}.{ext}"):
+            os.remove(f"{filepath}.{ext}")
+
+def preprocess_front(
+        image_path: str,
+        output_path: str,
+        card_width: float = 91.0,
+        card_height: float = 65.0,
+        dpi: int = 300) -> str:
+    """
+    Downscales a card image to the resolution it is printed at, so that pdflatex does not have to load and embed larger images. The aspect ratio is kept and images are never enlarged. Images that are small enough are copied unchanged.
+
+    Args:
+        image_path (str): File path to the card image.
+        output_path (str): File path to save the processed image to.
+        card_width (float, optional): Width of the card in mm. Defaults to 91.0.
+        card_height (float, optional): Height of the card in mm. Defaults to 65.0.
+        dpi (int, optional): Print resolution in dots per inch. Defaults to 300.
+
+    Returns:
+        str: `output_path`
+    """
+    print_size = (round(card_width / 25.4 * dpi), round(card_height / 25.4 * dpi))
+    with Image.open(image_path) as img:
+        if img.width <= print_size[0] and img.height <= print_size[1]:
+            shutil.copy2(image_path, output_path)
+            return output_path
+        image_format = img.format
+        img.thumbnail(print_size, Image.Resampling.LANCZOS)
+        if image_format == "JPEG": # avoid visible compression artifacts from Pillow's default quality
+            img.save(output_path, quality=95, subsampling=0, icc_profile=img.info.get("icc_profile"))
+        else:
+            img.save(output_path)
+    return output_path
+
 def task_cards_to_latex(
         front_images: list[str] = None,
         back_image: str = None,
         flip_backside: bool = False,
         card_height: float = 65.0,
         card_width: float = 91.0,
-        target_filepath: str = None):
+        target_filepath: str = None,
+        print_dpi: int = 300,
+        n_workers: int = None):
     """
 
 
@@ -221,6 +367,8 @@ def task_cards_to_latex(
         card_height (float, optional): 
         card_width (float, optional): 
         flip_backside (bool, optional): 
+        print_dpi (int, optional): resolution the front images are downscaled to in parallel before generating the document. The downscaled images are kept in the folder `print_<dpi>dpi` next to the generated .tex file and referenced by relative paths, so the .tex file can be recompiled later. Defaults to 300. If None, the original images are used.
+        n_workers (int, optional): number of worker processes used to downscale the front images. Defaults to None (number of CPU cores).
     """
     tk.Tk().withdraw()
     # file picker to choose folder with front images
@@ -239,6 +387,19 @@ def task_cards_to_latex(
     front_images = [img for img in front_images if img.endswith(".png") or img.endswith(".jpg") or img.endswith(".jpeg")]
     if target_filepath is None: # save 
         target_filepath = os.path.join(front_images_path, "task_cards")
+    if print_dpi is not None: # downscale front images to print resolution, each image is processed independently
+        print_folder = f"print_{print_dpi}dpi" # relative to the .tex file, which is compiled in its own folder
+        print_folder_path = os.path.join(os.path.dirname(os.path.abspath(target_filepath)), print_folder)
+        os.makedirs(print_folder_path, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            list(executor.map(
+                preprocess_front,
+                [os.path.join(front_images_path, img) for img in front_images],
+                [os.path.join(print_folder_path, img) for img in front_images],
+                repeat(card_width),
+                repeat(card_height),
+                repeat(print_dpi)))
+        front_images = [f"{print_folder}/{img}" for img in front_images]
 
     doc, filepath = generate_latex_document(
         fronts=front_images,
@@ -249,15 +410,11 @@ def task_cards_to_latex(
         card_height=card_height,
     )
     print(f"Generated LaTeX document at {filepath}.tex")
-    # Compile to pdf
+    # Compile the .tex file written above to pdf (doc.generate_pdf would serialize and write it again)
     filepath = filepath.strip(".tex")
-    doc.generate_pdf(
-        filepath,
-        compiler="pdflatex",
-        clean_tex=False)
+    compile_latex(filepath)
     print(f"Generated PDF at {filepath}.pdf")
 
-
 if __name__ == "__main__":
     # Example usage
     task_cards_to_latex(flip_backside=False)
@@ -1,4 +1,50 @@
-from PIL import Image, ImageChops
+from functools import lru_cache
+import math
+
+import numpy as np
+from PIL import Image
+
+# decoded cell images by file path, driver scripts generate several strips from the same cell images
+_cell_cache = {}
+
+def load_cell_image(img_path: str) -> Image.Image:
+    img = _cell_cache.get(img_path)
+    if img is None:
+        img = Image.open(img_path)
+        img.load()
+        _cell_cache[img_path] = img
+    return img
+
+@lru_cache(maxsize=None)
+def get_rotation_transform(width: int, height: int, angle: float):
+    # output size and affine matrix of Image.rotate(angle, expand=True), computed once per image size
+    center_x, center_y = width / 2, height / 2
+    angle = -math.radians(angle)
+    a, b = round(math.cos(angle), 15), round(math.sin(angle), 15)
+    d, e = -b, a
+    def transform(x, y, c=0.0, f=0.0):
+        return a * x + b * y + c, d * x + e * y + f
+    c, f = transform(-center_x, -center_y)
+    c, f = c + center_x, f + center_y
+    corners = [transform(x, y, c, f) for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+    expanded_width = math.ceil(max(x for x, _ in corners)) - math.floor(min(x for x, _ in corners))
+    expanded_height = math.ceil(max(y for _, y in corners)) - math.floor(min(y for _, y in corners))
+    c, f = transform(-(expanded_width - width) / 2.0, -(expanded_height - height) / 2.0, c, f)
+    return (expanded_width, expanded_height), (a, b, c, d, e, f)
+
+def alpha_paste(dst: np.ndarray, src: np.ndarray, x: int, y: int, blend_alpha: bool = True):
+    # paste RGBA array src onto dst at (x, y) using its alpha channel as mask (like Image.paste(src, pos, src))
+    # with blend_alpha=False the alpha channel of dst is kept, as when pasting onto an image without alpha
+    height, width = dst.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + src.shape[1], width), min(y + src.shape[0], height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = src[y0 - y:y1 - y, x0 - x:x1 - x]
+    region = dst[y0:y1, x0:x1]
+    channels = 4 if blend_alpha else 3
+    alpha = src[..., 3:4].astype(np.uint16)
+    region[..., :channels] = (src[..., :channels] * alpha + region[..., :channels] * (255 - alpha) + 127) // 255
 
 def generate_counting_strip(
             min_number: int,
@@ -25,75 +71,74 @@ def generate_counting_strip(
         cell_images = [Image.new('RGBA', (cell_size, cell_size))]
 
     # Resize the cell images
-    cell_images_resized = [img.resize((cell_size, cell_size)) if isinstance(img, Image.Image) else Image.open(img).resize((cell_size, cell_size)) for img in cell_images]
+    cell_images_resized = [img.resize((cell_size, cell_size)) if isinstance(img, Image.Image) else load_cell_image(img).resize((cell_size, cell_size)) for img in cell_images]
+    # decode each cell background to an RGBA array once
+    cell_arrays = [np.asarray(img.convert("RGBA")) for img in cell_images_resized]
+    cell_has_alpha = ["A" in img.getbands() for img in cell_images_resized]
     
-    # Initialize the image
-    strip = Image.new('RGBA', (length_px, cell_size))
-    
-    img = cell_images_resized[0].copy()
-    num_img = Image.open(f"{number_folders[0]}\\1.png")
+    # Initialize the strip as a pixel buffer, converted to an image once all cells are placed
+    strip_arr = np.zeros((cell_size, length_px, 4), dtype=np.uint8)
     
+    # rotation constants are the same for every cell
+    theta = math.radians(number_rotation)
+    cos_theta, sin_theta = math.cos(theta), math.sin(theta)
     if empty_first_cell:
         min_number -= 1
+    # every tenth number uses the third, every fifth number the second cell image, number folder and height (if given)
+    numbers = np.arange(min_number, max_number + 1)
+    tiers = np.where(numbers % 10 == 0, 2, np.where(numbers % 5 == 0, 1, 0))
+    cell_indices = np.minimum(tiers, len(cell_images) - 1).tolist()
+    folder_indices = np.minimum(tiers, len(number_folders) - 1).tolist()
+    height_indices = np.minimum(tiers, len(number_heights) - 1).tolist()
     for i, num in enumerate(range(min_number, max_number + 1)):
         if i == 0 and empty_first_cell:
             continue
+        # Each cell is drawn directly into its part of the strip
+        pos = i * cell_size + min(i, extra_pixels)  # Distribute the extra pixels evenly between the cells
+        cell_arr = strip_arr[:, pos:pos + cell_size]
         # load correct cell image as number background
-        if num % 10 == 0 and len(cell_images) >= 3:
-            img = cell_images_resized[2].copy()
-        elif num % 5 == 0 and len(cell_images) >= 2:
-            img = cell_images_resized[1].copy()
-        else:
-            img = cell_images_resized[0].copy()
+        cell_index = cell_indices[i]
+        np.copyto(cell_arr, cell_arrays[cell_index])
         # Load correct number image
-        if num % 10 == 0 and len(number_folders) >= 3:
-            num_img = Image.open(f"{number_folders[2]}/{num}.png")
-        elif num % 5 == 0 and len(number_folders) >= 2:
-            num_img = Image.open(f"{number_folders[1]}/{num}.png")
-        else:
-            num_img = Image.open(f"{number_folders[0]}/{num}.png")
+        num_img = Image.open(f"{number_folders[folder_indices[i]]}/{num}.png")
         # get correct number height
-        if num % 10 == 0 and len(number_heights) >= 3:
-            number_height = number_heights[2]
-        elif num % 5 == 0 and len(number_heights) >= 2:
-            number_height = number_heights[1]
-        else:
-            number_height = number_heights[0]
+        number_height = number_heights[height_indices[i]]
 
         # Resize the number image to fit the specified height and adjust the width accordingly
         orig_width, orig_height = num_img.size
         new_height = int(cell_size * number_height)
         new_width = int(new_height * orig_width / orig_height)
-        num_img_resized = num_img.resize((new_width, new_height))
+        # number images are already sharp, so the cheaper bilinear filter is sufficient
+        num_img_resized = num_img.resize((new_width, new_height), Image.Resampling.BILINEAR)
         # Calculate the offset based on the resized image and the number_offset tuple
         offset_x = int(new_width * number_offset[0])
         offset_y = -int(new_height * number_offset[1])
-        num_img_resized = ImageChops.offset(num_img_resized, offset_x, offset_y)
-        # Rotate the number image
-        num_img_resized = num_img_resized.rotate(number_rotation, expand=True)
-        # move number relative to background
+        # Rotate the number image. The offset is applied before rotating, so it turns with the number (y axis pointing down)
+        if number_rotation % 90 == 0: # PIL rotates these by transposing, which turns whole pixel offsets into whole pixel offsets
+            num_img_resized = num_img_resized.rotate(number_rotation, expand=True)
+            shift_x = round(offset_x * cos_theta + offset_y * sin_theta)
+            shift_y = round(-offset_x * sin_theta + offset_y * cos_theta)
+        else: # shift the sampled source pixels by the offset, then rotate in the same resampling step
+            rotated_size, (a, b, c, d, e, f) = get_rotation_transform(new_width, new_height, number_rotation)
+            num_img_resized = num_img_resized.transform(rotated_size, Image.Transform.AFFINE, (a, b, c - offset_x, d, e, f - offset_y))
+            shift_x = shift_y = 0
         # Calculate the center of the rotated image
         rotated_width, rotated_height = num_img_resized.size
         center_x = rotated_width // 2
         center_y = rotated_height // 2
 
-        # Calculate the new offset based on the center of the rotated image and the number_offset tuple
-        offset_x = (new_width // 2) - center_x
-        offset_y = (new_height // 2) - center_y
-
-        num_img_resized = ImageChops.offset(num_img_resized, offset_x, offset_y)
+        # Calculate the position to place the center of the rotated number image in the center of the cell
+        num_pos = ((cell_size - new_width) // 2 + new_width // 2 - center_x + shift_x,
+                   (cell_size - new_height) // 2 + new_height // 2 - center_y + shift_y)
+        if num_img_resized.mode != "RGBA": # convert() always copies, even if the mode already matches
+            num_img_resized = num_img_resized.convert("RGBA")
+        alpha_paste(cell_arr, np.asarray(num_img_resized), *num_pos, blend_alpha=cell_has_alpha[cell_index])
         
-        # Calculate the position to place the number image in the center of the cell
-        num_pos = ((cell_size - new_width) // 2, (cell_size - new_height) // 2)
-        img.paste(num_img_resized, num_pos, num_img_resized)
-        
-        # Paste the cell onto the strip
-        pos = i * cell_size + min(i, extra_pixels)  # Distribute the extra pixels evenly between the cells
         # add first column of pixels to fill the gap between cells
         if i > 0:
-            strip.paste(img.crop((0, 0, 1, cell_size)), (pos - 1, 0))
-        strip.paste(img, (pos, 0))
+            strip_arr[:, pos - 1] = cell_arr[:, 0]
     
+    strip = Image.fromarray(strip_arr)
     strip.save(save_path_prefix + f"counting_strip_{min_number}-{max_number}_{length_px}.png")
     return strip # return saved image
 
@@ -17,9 +17,7 @@ kernel = np.array([[-1, -1, -.5],
 filtered_alpha = cv2.filter2D(alpha_channel, -1, kernel)
 
 # Create a mask that selects only the upward edges
-mask = filtered_alpha.copy()
-mask[mask <= 0] = 0
-mask[mask > 0] = 255
+_, mask = cv2.threshold(filtered_alpha, 0, 255, cv2.THRESH_BINARY)
 
 # Create a new image with the same size as the original image, with a white background
 white_bg = Image.new('RGBA', (img.shape[1], img.shape[0]), (255, 255, 255, 255))
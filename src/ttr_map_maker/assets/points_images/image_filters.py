@@ -62,20 +62,12 @@ def apply_highlights(image: Image, light_direction: tuple, intensity=128, blur_r
     # Calculate light and dark highlights using the respective kernels
     light_highlights = calculate_highlights(np_image, light_kernel, intensity, blur_radius)
     dark_highlights = calculate_highlights(np_image, dark_kernel, intensity, blur_radius)
-    # Create the highlights and shadows arrays
-    highlights = np.zeros(np_image.shape, dtype=np.uint8)
-    highlights[:, :, :3] = np.array([light_highlights, light_highlights, light_highlights]).transpose((1, 2, 0))
-    shadows = np.array([dark_highlights, dark_highlights, dark_highlights]).transpose((1, 2, 0))
-    # Create a black image with the same shape as np_image
-    black_image = np.zeros(np_image.shape, dtype=np.uint8)
-    # Create a shadow mask by using the shadow array as the alpha channel
-    shadow_mask = shadows[:, :, 0]
     # Normalize the shadow mask to be in the range [0, 1]
-    shadow_mask = shadow_mask / 255.0
-    # Blend between the black image and np_image using the shadow mask as the alpha channel
-    blended_image = (1 - shadow_mask)[:, :, np.newaxis] * np_image + shadow_mask[:, :, np.newaxis] * black_image
-    # Add the highlights to the blended image
-    blended_image[:, :, :3] += highlights[:, :, :3]
+    shadow_mask = dark_highlights / 255.0
+    # Darken np_image towards black using the shadow mask as the alpha channel, broadcast over all channels
+    blended_image = (1 - shadow_mask)[:, :, np.newaxis] * np_image
+    # Add the highlights to the color channels of the blended image
+    blended_image[:, :, :3] += light_highlights[:, :, np.newaxis]
     # Clip the values to the valid range (0-255)
     blended_image = np.clip(blended_image, 0, 255)
     # Convert the resulting numpy array back to a PIL Image
@@ -92,9 +84,7 @@ def calculate_highlights(np_image, kernel, intensity=128, blur_radius=15):
     alpha_channel = np_image[:, :, 3]
     filtered_alpha = cv2.filter2D(alpha_channel, -1, kernel)
     # Create a mask that selects only the edges
-    mask = filtered_alpha.copy()
-    mask[mask <= 0] = 0
-    mask[mask > 0] = intensity
+    _, mask = cv2.threshold(filtered_alpha, 0, intensity, cv2.THRESH_BINARY)
     blurred_mask = cv2.GaussianBlur(mask, (blur_radius, blur_radius), 0)
     return blurred_mask
 
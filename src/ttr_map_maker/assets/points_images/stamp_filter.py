@@ -3,9 +3,6 @@ import numpy as np
 from PIL import Image
 from tkinter import filedialog
 from tkinter import Tk
-import noise
-import opensimplex
-from scipy.spatial import cKDTree
 
 def select_files():
     root = Tk()
@@ -30,9 +27,51 @@ def select_files():
 
 import cv2
 import numpy as np
-import noise
-import opensimplex
-from scipy.spatial import cKDTree
+
+PERLIN_GRADIENTS = np.array([[1, 1], [-1, 1], [1, -1], [-1, -1],
+                             [1, 0], [-1, 0], [0, 1], [0, -1]], dtype=float)
+
+def _fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+def _perlin_octave(x, y, permutation):
+    # gradient noise for all points at once, lattice corners looked up via the permutation table
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    xf = x - x0
+    yf = y - y0
+    xi = x0.astype(np.int64) & 255
+    yi = y0.astype(np.int64) & 255
+    u = _fade(xf)
+    v = _fade(yf)
+
+    def corner(dx, dy):
+        gradient = PERLIN_GRADIENTS[permutation[permutation[xi + dx] + yi + dy] & 7]
+        return gradient[..., 0] * (xf - dx) + gradient[..., 1] * (yf - dy)
+
+    n00 = corner(0, 0)
+    n10 = corner(1, 0)
+    n01 = corner(0, 1)
+    n11 = corner(1, 1)
+    nx0 = n00 + u * (n10 - n00)
+    nx1 = n01 + u * (n11 - n01)
+    return nx0 + v * (nx1 - nx0)
+
+def perlin_noise(xs, ys, octaves=1, persistence=0.5, lacunarity=2.0, seed=0):
+    # fractal Perlin noise on the grid xs x ys, result[i, j] belongs to (xs[i], ys[j])
+    permutation = np.random.default_rng(seed).permutation(256)
+    permutation = np.concatenate([permutation, permutation])
+    x, y = np.meshgrid(xs, ys, indexing="ij")
+    world = np.zeros(x.shape)
+    frequency = 1.0
+    amplitude = 1.0
+    max_amplitude = 0.0
+    for _ in range(octaves):
+        world += _perlin_octave(x * frequency, y * frequency, permutation) * amplitude
+        max_amplitude += amplitude
+        frequency *= lacunarity
+        amplitude *= persistence
+    return world / max_amplitude
 
 def apply_noise(width, height, noise_type="perlin"):
     if noise_type == "perlin":
@@ -41,35 +80,29 @@ def apply_noise(width, height, noise_type="perlin"):
         octaves = 6
         persistence = 0.5
         lacunarity = 2.0
-        world = np.zeros((width, height))
-        for i in range(width):
-            for j in range(height):
-                world[i][j] = noise.pnoise2(i/scale, j/scale, octaves=octaves, persistence=persistence, lacunarity=lacunarity)
+        world = perlin_noise(np.arange(width) / scale, np.arange(height) / scale,
+                             octaves=octaves, persistence=persistence, lacunarity=lacunarity)
         return world
 
     elif noise_type == "simplex":
         # OpenSimplex noise
-        simplex = opensimplex.OpenSimplex()
-        world = np.zeros((width, height))
-        for i in range(width):
-            for j in range(height):
-                world[i][j] = simplex.noise2(i, j)
+        import opensimplex # only imported when needed to keep start-up of short scripts fast
+        simplex = opensimplex.OpenSimplex(seed=0)
+        # noise2array evaluates the whole grid in one call and returns it indexed [y, x]
+        world = simplex.noise2array(np.arange(width), np.arange(height)).T
         return world
 
     elif noise_type == "worley":
-        # Worley noise
-        points = [[np.random.randint(0, height), np.random.randint(0, width)] for _ in range(100)]  # Generates Points(y, x)
-        coord = np.dstack(np.mgrid[0:height, 0:width])  # Makes array with coordinates as values
-        tree = cKDTree(points)  # Build Tree
-        world = tree.query(coord, workers=-1)[0]  # Calculate distances (workers=-1: Uses all CPU Cores)
+        # Worley noise: distance of every pixel to the nearest of 100 random feature points
+        from scipy import ndimage # only imported when needed to keep start-up of short scripts fast
+        mask = np.ones((width, height), dtype=bool)
+        mask[np.random.randint(0, width, 100), np.random.randint(0, height, 100)] = False
+        world = ndimage.distance_transform_edt(mask)  # Euclidean distance transform in a single pass
         return world
 
 def apply_stamp_effect(image, noise_type="perlin"):
-    # Convert the image to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    # Generate noise
-    noise = apply_noise(*gray.shape, noise_type)
+    # Generate noise with the height and width of the image
+    noise = apply_noise(image.shape[0], image.shape[1], noise_type)
     
     # Normalize noise to the range 0-255
     noise = cv2.normalize(noise, None, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_8U)
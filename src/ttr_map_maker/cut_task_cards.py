@@ -1,33 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
 import os
 
-import numpy as np
 from PIL import Image
 
 def find_borders_in_file(img):
-    img_array = np.array(img)
-    mask = img_array[..., 3] == 0  # Alpha value is the 4th channel in RGBA
+    # bounding box of the non-transparent pixels as (left, upper, right, lower), None if fully transparent
+    return img.getbbox()
 
-    # Find the bounding box of those pixels
-    coords = np.array(np.nonzero(~mask))
-    min_coords = np.min(coords, axis=1)
-    max_coords = np.max(coords, axis=1)
-
-    return (min_coords[1], min_coords[0], max_coords[1], max_coords[0])  # (left, upper, right, lower)
-
-def remove_borders_from_folder(input_folder, output_folder):
+def remove_borders_from_folder(input_folder, output_folder, n_workers=None):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
-    for filename in os.listdir(input_folder):
-        input_path = os.path.join(input_path, filename)
-        output_path = os.path.join(output_folder, filename)
-        remove_borders_from_file(input_folder, output_path)
+    filenames = os.listdir(input_folder)
+    input_paths = [os.path.join(input_folder, filename) for filename in filenames]
+    output_paths = [os.path.join(output_folder, filename) for filename in filenames]
+    # every file is decoded, cropped and encoded independently, so they are processed in parallel
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(remove_borders_from_file, input_paths, output_paths))
 
 def remove_borders_from_file(input_path, output_path):
     
     if input_path.endswith(('.png', '.jpg', '.jpeg')):
         img = Image.open(input_path).convert("RGBA")
         box = find_borders_in_file(img)
+        if box is None: # nothing to crop in a fully transparent image
+            img.save(output_path)
+            return
         img_cropped = img.crop(box)
         img_cropped.save(output_path)
     else:
@@ -15,13 +15,18 @@ Key features:
 
 # TODO: update doc strings
 """
+import os
 import random
-from math import sqrt
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import List, Tuple
 
 import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 
 from particle_edge import Particle_Edge
 from ttr_task import TTR_Task
@@ -48,7 +53,33 @@ class TTR_Graph_Analysis:
     self.tasks: dict[str, TTR_Task] = tasks # list of tasks (start location, end location)
 
     self.networkx_graph: nx.Graph = create_nx_graph(self.locations, self.edge_particles) # networkx graph object containing location and path information
-    self.task_lengths: dict[Tuple[str, str], int] = self.get_task_lengths() # shortest path lengths for all tasks
+    self._edge_lengths: dict[Tuple[str, str], int] = {} # (location, location) -> edge length, stored for both directions
+    for loc1, loc2, length in self.networkx_graph.edges(data="length"):
+      self._edge_lengths[(loc1, loc2)] = self._edge_lengths[(loc2, loc1)] = length
+    self._location_indices: dict[str, int] = {location: i for i, location in enumerate(self.networkx_graph.nodes)} # location name -> node index in the sparse matrix
+    self._csr_graph, self._csr_edge_indices = self._build_csr() # sparse matrix of edge lengths and edge -> index into its `data` array
+    self._build_particle_arrays()
+    self._connection_arrays: Tuple[np.ndarray, ...] = None # cached result of `_get_connection_arrays`
+    self._shortest_connection_indices: dict[Tuple[str, str], List[int]] = self._get_shortest_connection_indices() # (start location, end location) -> indices of the shortest connections
+    self._all_shortest_paths_cache: dict[Tuple[str, str], List[Tuple[List[str], int]]] = {} # (start location, end location) -> all shortest paths and their lengths
+    self._shortest_path_predecessors: dict[str, Tuple[dict[str, List[str]], dict[str, int]]] = {} # start location -> (predecessors on shortest paths, distances) for all locations
+    self._path_edge_ids: dict[Tuple[str, str, int], int] = {} # edge (start location, end location, connection index) on a shortest path -> edge id
+    self._path_edge_ids_cache: dict[Tuple[str, str], List[Tuple[np.ndarray, List[np.ndarray]]]] = {} # (start location, end location) -> edge ids of all shortest paths
+    self._distribution_cache: dict[str, dict] = None # cached result of `compute_all_distributions`
+    self._task_end_lengths: dict[Tuple[str, str], int] = {} # (start location, end location) -> shortest path length in the graph of the class
+
+  @property
+  def task_lengths(self) -> dict[str, int]:
+    """
+    Shortest path lengths for all current tasks in the graph of the class.
+    Lengths are cached by start and end location, so tasks added or edited since the last access (e.g. in the task editor) are calculated on demand.
+    """
+    task_ends: dict[str, Tuple[str, str]] = {task_key: (task.node_names[0], task.node_names[-1]) for task_key, task in self.tasks.items()}
+    missing_task_keys = [task_key for task_key, ends in task_ends.items() if ends not in self._task_end_lengths]
+    if missing_task_keys:
+      for task_key, length in self.get_task_lengths(task_keys=missing_task_keys).items():
+        self._task_end_lengths[task_ends[task_key]] = length
+    return {task_key: self._task_end_lengths[ends] for task_key, ends in task_ends.items()}
 
 # access methods for basic graph information
 
@@ -91,42 +122,172 @@ class TTR_Graph_Analysis:
 
 # methods to calculate basic graph information
 
-  def get_path_cost(self, location_list: List[str]) -> int:
+  def get_path_cost(self, location_list: List[str], graph: nx.Graph = None) -> int:
     """
     Calculate the cost of a path.
 
     Args:
         location_list (List[str]): list of locations on the path
+        graph (nx.Graph, optional): graph to take the edge lengths from. Defaults to None (use the graph from the class)
 
     Returns:
         int: cost of the path
     """
+    if graph is None:
+      return sum(self._edge_lengths[edge] for edge in zip(location_list[:-1], location_list[1:]))
     cost = 0
     for i in range(len(location_list) - 1):
       edge = (location_list[i], location_list[i+1])
-      cost += self.networkx_graph.edges[edge]["length"]
+      cost += graph.edges[edge]["length"]
     return cost
 
-  def get_task_lengths(self, graph: nx.Graph = None) -> dict[Tuple[str, str], int]:
+  def get_task_lengths(self, graph: nx.Graph = None, task_keys: List[str] = None) -> dict[Tuple[str, str], int]:
     """
     Get the lengths of all tasks.
 
     Args:
         graph (nx.Graph, optional): graph to use for the analysis. Defaults to None (use the graph from the class)
+        task_keys (List[str], optional): keys of the tasks to calculate the lengths of. Defaults to None (all tasks).
 
     Returns:
         dict[Tuple[str, str], int]: dictionary of lengths for each task.
     """
+    if task_keys is None:
+      task_keys = self.tasks.keys()
     if graph is None:
-      graph = self.networkx_graph
+      return self._get_task_lengths_csr(task_keys)
     task_lengths: dict[str, int] = {}
-    for task_key, task in self.tasks.items():
+    for task_key in task_keys:
+      task = self.tasks[task_key]
       path, length = self.get_shortest_path(task.node_names[0], task.node_names[-1], graph)
       task_lengths[task_key] = length
     return task_lengths
 
 # pathfinding methods
 
+  def _build_csr(self) -> Tuple[csr_matrix, dict[Tuple[str, str], int]]:
+    """
+    Build a sparse matrix of edge lengths of the class graph for scipy's shortest path algorithms. Each edge is only stored in one direction, so the matrix has to be treated as undirected.
+
+    Returns:
+        csr_matrix: sparse matrix of edge lengths
+        dict[Tuple[str, str], int]: index of each edge's length in the `data` array of the matrix
+    """
+    n_locations = len(self._location_indices)
+    edges = list(self.networkx_graph.edges)
+    rows = [self._location_indices[loc1] for loc1, _ in edges]
+    cols = [self._location_indices[loc2] for _, loc2 in edges]
+    # store edge numbers first to find out where csr_matrix puts each edge
+    csr_graph = csr_matrix(
+        (np.arange(1, len(edges) + 1, dtype=float), (rows, cols)),
+        shape=(n_locations, n_locations))
+    edge_order = csr_graph.data.astype(int) - 1
+    csr_edge_indices: dict[Tuple[str, str], int] = {edges[edge_number]: i for i, edge_number in enumerate(edge_order)}
+    lengths = np.array([self.networkx_graph.edges[edge]["length"] for edge in edges], dtype=float)
+    csr_graph.data = lengths[edge_order]
+    return csr_graph, csr_edge_indices
+
+  def _build_particle_arrays(self):
+    """
+    Store the keys and colors of all edge particles as parallel integer arrays (structure of arrays), so that statistics over particles can be computed with numpy instead of python loops over the dictionary.
+    Locations are given by their index in the sparse matrix, colors by their index in `self._colors`.
+    """
+    n_particles = len(self.edge_particles)
+    color_indices: dict[str, int] = {}
+    self._particle_loc1 = np.fromiter((self._location_indices[key[0]] for key in self.edge_particles), dtype=np.int32, count=n_particles)
+    self._particle_loc2 = np.fromiter((self._location_indices[key[1]] for key in self.edge_particles), dtype=np.int32, count=n_particles)
+    self._particle_path_index = np.fromiter((key[2] for key in self.edge_particles), dtype=np.int32, count=n_particles)
+    self._particle_connection_index = np.fromiter((key[3] for key in self.edge_particles), dtype=np.int32, count=n_particles)
+    self._particle_color = np.fromiter(
+        (color_indices.setdefault(particle_edge.color, len(color_indices)) for particle_edge in self.edge_particles.values()),
+        dtype=np.int32, count=n_particles)
+    self._colors: List[str] = list(color_indices) # color index -> color name
+
+  def _get_connection_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group the edge particles by connection (start location, end location, connection index). Connections are ordered by their first particle in `edge_particles`.
+    The grouping is only done once and shared by all statistics over connections.
+
+    Returns:
+        np.ndarray: start location index of each connection
+        np.ndarray: end location index of each connection
+        np.ndarray: connection index of each connection
+        np.ndarray: length of each connection (max path index + 1)
+        np.ndarray: number of particles of each connection
+        np.ndarray: color index of each connection (color of its first particle)
+    """
+    if self._connection_arrays is not None:
+      return self._connection_arrays
+    particle_connections = np.stack((self._particle_loc1, self._particle_loc2, self._particle_connection_index), axis=1)
+    connections, first_indices, inverse, particle_counts = np.unique(
+        particle_connections, axis=0, return_index=True, return_inverse=True, return_counts=True)
+    max_path_indices = np.zeros(len(connections), dtype=np.int32)
+    np.maximum.at(max_path_indices, inverse.ravel(), self._particle_path_index)
+    order = np.argsort(first_indices, kind="stable")
+    connections = connections[order]
+    self._connection_arrays = (
+        connections[:, 0],
+        connections[:, 1],
+        connections[:, 2],
+        max_path_indices[order] + 1,
+        particle_counts[order],
+        self._particle_color[first_indices[order]])
+    for connection_array in self._connection_arrays:
+      connection_array.flags.writeable = False # shared between callers
+    return self._connection_arrays
+
+  def _get_task_lengths_csr(self, task_keys: List[str]) -> dict[Tuple[str, str], int]:
+    """
+    Get the lengths of the given tasks in the class graph with a single call of scipy's dijkstra for all task start locations.
+
+    Args:
+        task_keys (List[str]): keys of the tasks to calculate the lengths of
+
+    Returns:
+        dict[Tuple[str, str], int]: dictionary of lengths for each task.
+    """
+    tasks = [(task_key, self.tasks[task_key]) for task_key in task_keys]
+    if not tasks:
+      return {}
+    start_indices = [self._location_indices[task.node_names[0]] for _, task in tasks]
+    sources, source_rows = np.unique(start_indices, return_inverse=True)
+    distances = dijkstra(self._csr_graph, directed=False, indices=sources)
+    task_lengths: dict[str, int] = {}
+    for source_row, (task_key, task) in zip(source_rows, tasks):
+      length = distances[source_row, self._location_indices[task.node_names[-1]]]
+      task_lengths[task_key] = int(length) if np.isfinite(length) else float("inf")
+    return task_lengths
+
+  def _get_tasks_by_edge(self) -> dict[int, List[str]]:
+    """
+    Find the tasks whose shortest path in the class graph uses each edge. Only these tasks can get longer if that edge is removed.
+
+    Returns:
+        dict[int, List[str]]: keys of the tasks using each edge. Edges are given by their index in the `data` array of the sparse matrix.
+    """
+    if not self.tasks:
+      return {}
+    # map pairs of node indices to edges in both directions
+    data_indices: dict[Tuple[int, int], int] = {}
+    for row in range(self._csr_graph.shape[0]):
+      for data_index in range(self._csr_graph.indptr[row], self._csr_graph.indptr[row + 1]):
+        col = self._csr_graph.indices[data_index]
+        data_indices[(row, col)] = data_index
+        data_indices[(col, row)] = data_index
+    start_indices = [self._location_indices[task.node_names[0]] for task in self.tasks.values()]
+    sources, source_rows = np.unique(start_indices, return_inverse=True)
+    _, predecessors = dijkstra(self._csr_graph, directed=False, indices=sources, return_predecessors=True)
+    tasks_by_edge: dict[int, List[str]] = {}
+    for source_row, (task_key, task) in zip(source_rows, self.tasks.items()):
+      # walk the shortest path backwards from the task's end location
+      node = self._location_indices[task.node_names[-1]]
+      previous_node = predecessors[source_row, node]
+      while previous_node >= 0:
+        tasks_by_edge.setdefault(data_indices[(previous_node, node)], []).append(task_key)
+        node = previous_node
+        previous_node = predecessors[source_row, node]
+    return tasks_by_edge
+
   def get_shortest_path(self, loc1: str, loc2: str, graph: nx.Graph = None) -> Tuple[List[str], int]:
     """
     Find the shortest path between two locations.
@@ -142,11 +303,39 @@ class TTR_Graph_Analysis:
     """
     if graph is None:
       graph = self.networkx_graph
+    return self._find_shortest_path(loc1, loc2, graph)
+
+  def _find_shortest_path(self, loc1: str, loc2: str, graph: nx.Graph) -> Tuple[List[str], int]:
+    if graph is self.networkx_graph:
+      return self._find_shortest_path_csr(loc1, loc2)
     try:
       path = nx.shortest_path(graph, loc1, loc2, weight="length")
     except nx.exception.NetworkXNoPath: # no path exists
       return [], float("inf")
-    return path, self.get_path_cost(path)
+    return path, self.get_path_cost(path, graph)
+
+  def _find_shortest_path_csr(self, loc1: str, loc2: str) -> Tuple[List[str], int]:
+    """
+    Find the shortest path between two locations in the class graph using scipy's dijkstra on the sparse matrix.
+
+    Args:
+        loc1 (str): start location
+        loc2 (str): end location
+
+    Returns:
+        List[str]: list of locations on the shortest path
+        int: length of the shortest path
+    """
+    start_index = self._location_indices[loc1]
+    end_index = self._location_indices[loc2]
+    distances, predecessors = dijkstra(self._csr_graph, directed=False, indices=start_index, return_predecessors=True)
+    if not np.isfinite(distances[end_index]): # no path exists
+      return [], float("inf")
+    locations: List[str] = list(self._location_indices)
+    path_indices: List[int] = [end_index]
+    while path_indices[-1] != start_index:
+      path_indices.append(predecessors[path_indices[-1]])
+    return [locations[i] for i in reversed(path_indices)], int(distances[end_index])
 
   def get_all_shortest_paths(self, loc1: str, loc2: str) -> List[Tuple[List[str], int]]:
     """
@@ -159,11 +348,39 @@ class TTR_Graph_Analysis:
     Returns:
         List[Tuple[List[str], int]]: list of shortest paths between te given locations and their lengths
     """
-    paths = nx.all_shortest_paths(self.networkx_graph, loc1, loc2, weight="length")
-    shortest_paths = []
-    for path in paths:
-      shortest_paths.append((path, self.get_path_cost(path)))
-    return shortest_paths
+    shortest_paths = self._all_shortest_paths_cache.get((loc1, loc2))
+    if shortest_paths is None:
+      if loc1 not in self._shortest_path_predecessors and loc2 in self._shortest_path_predecessors:
+        # the graph is undirected: search backwards from the end location, which has already been searched from
+        predecessors, distances = self._shortest_path_predecessors[loc2]
+        if loc1 not in predecessors:
+          raise nx.NetworkXNoPath(f"Target {loc2} cannot be reached from given sources")
+        shortest_paths = [(path[::-1], distances[loc1]) for path in _build_shortest_paths(predecessors, loc2, loc1)]
+      else:
+        predecessors, distances = self._get_shortest_path_predecessors(loc1)
+        if loc2 not in predecessors:
+          raise nx.NetworkXNoPath(f"Target {loc2} cannot be reached from given sources")
+        shortest_paths = [(path, distances[loc2]) for path in _build_shortest_paths(predecessors, loc1, loc2)]
+      self._all_shortest_paths_cache[(loc1, loc2)] = shortest_paths
+      self._all_shortest_paths_cache[(loc2, loc1)] = [(path[::-1], length) for path, length in shortest_paths]
+    return list(shortest_paths)
+
+  def _get_shortest_path_predecessors(self, loc1: str) -> Tuple[dict[str, List[str]], dict[str, int]]:
+    """
+    Run dijkstra once from the given location to all other locations. Results are cached, so all tasks starting at the same location share one search.
+
+    Args:
+        loc1 (str): start location
+
+    Returns:
+        dict[str, List[str]]: for each reachable location, its predecessors on shortest paths from `loc1`
+        dict[str, int]: length of the shortest path from `loc1` to each reachable location
+    """
+    result = self._shortest_path_predecessors.get(loc1)
+    if result is None:
+      result = nx.dijkstra_predecessor_and_distance(self.networkx_graph, loc1, weight="length")
+      self._shortest_path_predecessors[loc1] = result
+    return result
 
   def get_shortest_task_paths(self) -> List[Tuple[List[str], int]]:
     """
@@ -215,57 +432,123 @@ class TTR_Graph_Analysis:
     #     else:
     #       edge_counts[edge] = 1
     # return edge_counts
-    task_edge_counts: dict[Tuple[str, str, int], int] = {}
-    for task in self.tasks.values():
-      shortest_paths = self.get_all_shortest_paths(loc1=task.node_names[0], loc2=task.node_names[-1])
-      for _ in range(n_random_paths):
-        path, length = random.choice(shortest_paths)
-        for (loc1, loc2) in zip(path[:-1], path[1:]):
-          connection_index = self.get_shortest_connection_index(loc1, loc2)
-          edge = (loc1, loc2, connection_index)
-          if edge in task_edge_counts:
-            task_edge_counts[edge] += 1/n_random_paths
-          else:
-            task_edge_counts[edge] = 1/n_random_paths
-    
+    rng = np.random.default_rng()
+    task_path_edge_ids = [self._get_path_edge_ids(task.node_names[0], task.node_names[-1]) for task in self.tasks.values()]
+    edge_counts = np.zeros(len(self._path_edge_ids))
+    for shortest_path_edge_ids in task_path_edge_ids:
+      # draw how often each path is chosen in `n_random_paths` uniform samples at once, then handle each distinct path only once
+      path_counts = rng.multinomial(n_random_paths, np.full(len(shortest_path_edge_ids), 1 / len(shortest_path_edge_ids)))
+      for (edge_ids, tied_edge_ids), path_count in zip(shortest_path_edge_ids, path_counts):
+        if path_count == 0:
+          continue
+        np.add.at(edge_counts, edge_ids, path_count)
+        for candidate_edge_ids in tied_edge_ids:
+          # choose one of the shortest connections (uniformly) randomly for each sampled path
+          np.add.at(edge_counts, candidate_edge_ids, rng.multinomial(path_count, np.full(len(candidate_edge_ids), 1 / len(candidate_edge_ids))))
+    edge_counts /= n_random_paths
+    task_edge_counts: dict[Tuple[str, str, int], float] = {
+      edge: edge_counts[edge_id].item() for edge, edge_id in self._path_edge_ids.items() if edge_counts[edge_id] > 0}
     return task_edge_counts
 
-  def get_shortest_connection_index(self, loc1: str, loc2: str):
-    # find all existing connection indices
-    max_connection_index: int = 0
-    connection_index_lengths: dict[int, int] = {}
-    for edge in self.edge_particles:
-      if edge[0] == loc1 and edge[1] == loc2:
-        connection_index: int = edge[3]
-        if connection_index in connection_index_lengths:
-          connection_index_lengths[connection_index] += 1
+  def _get_path_edge_ids(self, loc1: str, loc2: str) -> List[Tuple[np.ndarray, List[np.ndarray]]]:
+    """
+    Convert all shortest paths between two locations to arrays of edge ids (see `self._path_edge_ids`). Results are cached.
+
+    Args:
+        loc1 (str): start location
+        loc2 (str): end location
+
+    Returns:
+        List[Tuple[np.ndarray, List[np.ndarray]]]: for each shortest path:
+          ids of the edges used by the path where only one shortest connection exists
+          for each step with several equally short connections, the ids of these connections
+    """
+    shortest_path_edge_ids = self._path_edge_ids_cache.get((loc1, loc2))
+    if shortest_path_edge_ids is not None:
+      return shortest_path_edge_ids
+    shortest_path_edge_ids = []
+    for path, _ in self.get_all_shortest_paths(loc1=loc1, loc2=loc2):
+      edge_ids: List[int] = []
+      tied_edge_ids: List[np.ndarray] = []
+      for (step_loc1, step_loc2) in zip(path[:-1], path[1:]):
+        connection_indices = self._shortest_connection_indices.get((step_loc1, step_loc2), [0])
+        candidate_edge_ids = [
+            self._path_edge_ids.setdefault((step_loc1, step_loc2, connection_index), len(self._path_edge_ids))
+            for connection_index in connection_indices]
+        if len(candidate_edge_ids) == 1:
+          edge_ids.append(candidate_edge_ids[0])
         else:
-          connection_index_lengths[connection_index] = 1
-        max_connection_index = max(max_connection_index, edge[2])
-    # find the shortest connection index
-    if max_connection_index == 0:
+          tied_edge_ids.append(np.array(candidate_edge_ids, dtype=np.int32))
+      shortest_path_edge_ids.append((np.array(edge_ids, dtype=np.int32), tied_edge_ids))
+    self._path_edge_ids_cache[(loc1, loc2)] = shortest_path_edge_ids
+    return shortest_path_edge_ids
+
+  def get_shortest_connection_index(self, loc1: str, loc2: str):
+    shortest_connection_indices: List[int] = self._shortest_connection_indices.get((loc1, loc2))
+    if shortest_connection_indices is None: # all connections have length 1
       return 0
-    # get dict key with minimum value
-    shortest_connection: int = min(connection_index_lengths.values())
-    shortest_connection_indeces: List[int] = [connection_index for connection_index, length in connection_index_lengths.items() if length == shortest_connection]
-    return random.choice(shortest_connection_indeces)
+    return random.choice(shortest_connection_indices)
+
+  def _get_shortest_connection_indices(self) -> dict[Tuple[str, str], List[int]]:
+    """
+    Find the connection indices of the shortest connections between each pair of locations.
+
+    Returns:
+        dict[Tuple[str, str], List[int]]: connection indices with minimal length for each pair of locations (start location, end location).
+            Pairs where all connections have length 1 are omitted.
+    """
+    # find all existing connection indices and their lengths (number of particles)
+    locations: List[str] = list(self._location_indices)
+    loc1_indices, loc2_indices, connection_indices, max_lengths, particle_counts, _ = self._get_connection_arrays()
+    connection_index_lengths: dict[Tuple[str, str], dict[int, int]] = {}
+    max_connection_lengths: dict[Tuple[str, str], int] = {}
+    for loc1, loc2, connection_index, max_length, particle_count in zip(
+        loc1_indices.tolist(), loc2_indices.tolist(), connection_indices.tolist(), max_lengths.tolist(), particle_counts.tolist()):
+      location_pair = (locations[loc1], locations[loc2])
+      connection_index_lengths.setdefault(location_pair, {})[connection_index] = particle_count
+      max_connection_lengths[location_pair] = max(max_connection_lengths.get(location_pair, 1), max_length)
+    shortest_connection_indices: dict[Tuple[str, str], List[int]] = {}
+    for location_pair, lengths in connection_index_lengths.items():
+      if max_connection_lengths[location_pair] == 1:
+        continue
+      shortest_connection: int = min(lengths.values())
+      shortest_connection_indices[location_pair] = [connection_index for connection_index, length in lengths.items() if length == shortest_connection]
+    return shortest_connection_indices
 
 # connectedness analysis methods
 
   def get_node_importance(self) -> dict[str, float]:
     """
     Calculate the importance of each node in the graph: how much the average task length is increased if that node is removed.
+    Tasks starting or ending at the removed node and tasks that are impossible even in the full graph are left out of both averages.
 
     Returns:
         dict[str, float]: dictionary of nodes and the avergae increase in task length if that node is removed
     """
     node_importance = {}
-    average_task_length = self.get_average_task_length()
-    for node in self.networkx_graph.nodes:
-      # copy graph and remove node
-      new_graph = self.networkx_graph.copy()
-      new_graph.remove_node(node)
-      node_importance[node] = self.get_average_task_length(new_graph) - average_task_length
+    original_task_lengths = self.task_lengths
+    original_lengths = np.array([original_task_lengths[task_key] for task_key in self.tasks], dtype=float)
+    start_indices = np.array([self._location_indices[task.node_names[0]] for task in self.tasks.values()], dtype=np.int32)
+    end_indices = np.array([self._location_indices[task.node_names[-1]] for task in self.tasks.values()], dtype=np.int32)
+    possible_tasks = np.isfinite(original_lengths)
+    csr_data = self._csr_graph.data
+    # node indices at both ends of each entry in the sparse matrix
+    csr_rows = np.repeat(np.arange(self._csr_graph.shape[0]), np.diff(self._csr_graph.indptr))
+    csr_cols = self._csr_graph.indices
+    for node, node_index in self._location_indices.items():
+      # "remove" node by temporarily making all its edges infinitely long instead of copying the graph
+      incident_data_indices = np.flatnonzero((csr_rows == node_index) | (csr_cols == node_index))
+      original_edge_lengths = csr_data[incident_data_indices]
+      csr_data[incident_data_indices] = np.inf
+      try:
+        task_lengths = np.array(list(self.get_task_lengths().values()), dtype=float)
+      finally:
+        csr_data[incident_data_indices] = original_edge_lengths
+      counted_tasks = possible_tasks & (start_indices != node_index) & (end_indices != node_index)
+      if not counted_tasks.any(): # no task can be affected by removing the node
+        node_importance[node] = 0.0
+        continue
+      node_importance[node] = (task_lengths[counted_tasks].mean() - original_lengths[counted_tasks].mean()).item()
     return node_importance
 
   # def get_edge_importance(self) -> dict[Tuple[str, str, int], float]:
@@ -286,40 +569,94 @@ class TTR_Graph_Analysis:
   #     edge_importance[(edge[0], edge[1], connection_index)] = self.get_average_task_length(new_graph) - average_task_length
   #   return edge_importance
 
-  def get_edge_importance(self) -> dict[Tuple[str, str, int], float]:
+  def get_edge_importance(self, n_workers: int = 1) -> dict[Tuple[str, str, int], float]:
     """
     Calculate the importance of each edge in the graph: how much a task length is increased at most if that edge is removed.
 
+    Args:
+        n_workers (int, optional): number of worker processes used to evaluate edge removals. Use `None` for one process per CPU core. Defaults to 1 (no multiprocessing).
+
     Returns:
         dict[Tuple[str, str, int], float]: dictionary of edges and the avergae increase in task length if that edge is removed
             The edge is represented as a tuple of the two locations and the connection index.
     """
     edge_importance: dict[Tuple[str, str, int], float] = {}
-    original_task_lengths = self.get_task_lengths()
+    original_task_lengths = self.task_lengths
+    tasks_by_edge = self._get_tasks_by_edge()
+    if n_workers is None:
+      n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(tasks_by_edge)))
+    if n_workers > 1:
+      return self._get_edge_importance_parallel(original_task_lengths, tasks_by_edge, n_workers)
+    csr_data = self._csr_graph.data
     for edge in self.networkx_graph.edges:
-      # copy graph and remove edge
-      new_graph = self.networkx_graph.copy()
-      new_graph.remove_edge(*edge)
+      data_index = self._csr_edge_indices[edge]
+      affected_task_keys = tasks_by_edge.get(data_index)
+      if affected_task_keys is None: # no shortest path uses this edge, so no task gets longer
+        task_length_increase = 0
+      else:
+        # "remove" edge by temporarily making it infinitely long in the sparse matrix instead of copying the graph
+        original_length = csr_data[data_index]
+        csr_data[data_index] = np.inf
+        try:
+          task_length_increase = self.get_maximum_task_length_increase(None, original_task_lengths, task_keys=affected_task_keys)
+        finally:
+          csr_data[data_index] = original_length
       connection_index = self.networkx_graph.edges[edge]['key']
-      task_length_increase = self.get_maximum_task_length_increase(new_graph, original_task_lengths)
       edge_importance[(edge[0], edge[1], connection_index)] = task_length_increase
     return edge_importance
   
-  def get_maximum_task_length_increase(self, new_graph, original_task_lengths) -> float:
+  def _get_edge_importance_parallel(self,
+      original_task_lengths: dict[str, int],
+      tasks_by_edge: dict[int, List[str]],
+      n_workers: int) -> dict[Tuple[str, str, int], float]:
+    """
+    Calculate the edge importance with edge removals split over `n_workers` processes. Each process gets its own copy of the sparse matrix once, then only edge and task indices are sent per edge.
+
+    Args:
+        original_task_lengths (dict[str, int]): task lengths in the unchanged graph
+        tasks_by_edge (dict[int, List[str]]): keys of the tasks using each edge, see `_get_tasks_by_edge`
+        n_workers (int): number of worker processes
+
+    Returns:
+        dict[Tuple[str, str, int], float]: see `get_edge_importance`
+    """
+    task_positions: dict[str, int] = {task_key: i for i, task_key in enumerate(self.tasks)}
+    start_indices = np.array([self._location_indices[task.node_names[0]] for task in self.tasks.values()], dtype=np.int32)
+    end_indices = np.array([self._location_indices[task.node_names[-1]] for task in self.tasks.values()], dtype=np.int32)
+    original_lengths = np.array([original_task_lengths[task_key] for task_key in self.tasks], dtype=float)
+    edges = [edge for edge in self.networkx_graph.edges if self._csr_edge_indices[edge] in tasks_by_edge]
+    payloads = [
+        (self._csr_edge_indices[edge], [task_positions[task_key] for task_key in tasks_by_edge[self._csr_edge_indices[edge]]])
+        for edge in edges]
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_edge_importance_worker,
+        initargs=(self._csr_graph, start_indices, end_indices, original_lengths)) as executor:
+      increases = dict(zip(edges, executor.map(_edge_importance_worker, payloads, chunksize=max(1, len(payloads) // (4 * n_workers)))))
+    edge_importance: dict[Tuple[str, str, int], float] = {}
+    for edge in self.networkx_graph.edges:
+      connection_index = self.networkx_graph.edges[edge]['key']
+      edge_importance[(edge[0], edge[1], connection_index)] = increases.get(edge, 0) # unused edges don't increase any task length
+    return edge_importance
+
+  def get_maximum_task_length_increase(self, new_graph, original_task_lengths, task_keys: List[str] = None) -> float:
     """
     Calculate the maximum task length increase caused by removing an edge from the graph.
 
     Args:
-        graph: The graph from which the edge will be removed.
+        new_graph: The graph from which the edge was removed. If None, use the (masked) graph of the class.
+        original_task_lengths: The task lengths before removing the edge.
+        task_keys (List[str], optional): keys of the tasks that may be affected by the removal. Defaults to None (all tasks).
 
     Returns:
         float: The maximum task length increase.
     """
-    new_task_lengths = self.get_task_lengths(new_graph)
+    new_task_lengths = self.get_task_lengths(new_graph, task_keys)
 
     max_increase = 0
-    for task_id, original_task_length in original_task_lengths.items():
-        new_task_length = new_task_lengths[task_id]
+    for task_id, new_task_length in new_task_lengths.items():
+        original_task_length = original_task_lengths[task_id]
         increase = new_task_length - original_task_length
         if increase > max_increase:
             max_increase = increase
@@ -337,12 +674,61 @@ class TTR_Graph_Analysis:
         float: average task length
     """
     if graph is None:
-      graph = self.networkx_graph
-    task_lengths = list(self.get_task_lengths(graph).values())
+      task_lengths = list(self.task_lengths.values())
+    else:
+      task_lengths = list(self.get_task_lengths(graph).values())
     return sum(task_lengths) / len(task_lengths)
 
 # plottable graph information (various distributions)
 
+  def compute_all_distributions(self) -> dict[str, dict]:
+    """
+    Calculate all distributions over the edges of the graph at once and cache them. The result is shared between calls, so it must not be modified. The `get_*_distribution` methods return copies.
+
+    Returns:
+        dict[str, dict]: dictionary with the following distributions:
+          "node_degree": see `get_node_degree_distribution`
+          "edge_length": see `get_edge_length_distribution`
+          "edge_length_by_color": edge length distribution of each color in the networkx graph
+          "edge_color_length": see `get_edge_color_length_distribution`
+          "edge_color": see `get_edge_color_distribution`
+          "edge_color_total_length": see `get_edge_color_total_length_distribution`
+    """
+    if self._distribution_cache is not None:
+      return self._distribution_cache
+    loc1_indices, loc2_indices, _, lengths, _, colors = self._get_connection_arrays()
+    # count each connection once for both of its end locations
+    node_degrees = np.bincount(np.concatenate((loc1_indices, loc2_indices)), minlength=len(self._location_indices))
+    degrees, degree_counts = np.unique(node_degrees[node_degrees > 0], return_counts=True)
+    # count connections per (color, length) pair, keeping the order in which pairs first appear
+    n_lengths = int(lengths.max()) + 1 if len(lengths) else 1
+    pairs, first_indices, pair_counts = np.unique(colors * n_lengths + lengths, return_index=True, return_counts=True)
+    edge_color_length_distribution: dict[str, dict[int, int]] = {}
+    for i in np.argsort(first_indices, kind="stable"):
+      color_index, length = divmod(int(pairs[i]), n_lengths)
+      edge_color_length_distribution.setdefault(self._colors[color_index], {})[length] = int(pair_counts[i])
+    # edge lengths in the networkx graph (parallel connections are merged there)
+    edge_length_distribution: dict[int, int] = {}
+    edge_length_by_color: dict[str, dict[int, int]] = {}
+    for _, _, edge_data in self.networkx_graph.edges(data=True):
+      length = edge_data["length"]
+      edge_length_distribution[length] = edge_length_distribution.get(length, 0) + 1
+      color_distribution = edge_length_by_color.setdefault(edge_data["color"], {})
+      color_distribution[length] = color_distribution.get(length, 0) + 1
+    self._distribution_cache = {
+      "node_degree": dict(zip(degrees.tolist(), degree_counts.tolist())),
+      "edge_length": edge_length_distribution,
+      "edge_length_by_color": edge_length_by_color,
+      "edge_color_length": edge_color_length_distribution,
+      "edge_color": {
+        color: sum(length_distribution.values())
+        for color, length_distribution in edge_color_length_distribution.items()},
+      "edge_color_total_length": {
+        color: sum([length * count for length, count in length_distribution.items()])
+        for color, length_distribution in edge_color_length_distribution.items()},
+    }
+    return self._distribution_cache
+
   def get_node_degree_distribution(self) -> dict[int, int]:
     """
     Calculate the degree distribution of the nodes.
@@ -350,20 +736,7 @@ class TTR_Graph_Analysis:
     Returns:
         dict[int, int]: dictionary of degrees and their counts
     """
-    node_degrees: dict[str, int] = {}
-    seen_edges: set[tuple[str, str, int]] = set()
-    for edge_id in self.edge_particles.keys():
-      loc1, loc2, path_index, connection_index = edge_id
-      shortened_edge_id = (loc1, loc2, connection_index)
-      if shortened_edge_id in seen_edges:
-        continue
-      seen_edges.add(shortened_edge_id)
-      for node in (loc1, loc2):
-        node_degrees[node] = node_degrees.get(node, 0) + 1
-        
-    degree_distribution: dict[int, int] = {
-      degree: list(node_degrees.values()).count(degree) for degree in set(node_degrees.values())
-    }
+    degree_distribution: dict[int, int] = dict(self.compute_all_distributions()["node_degree"])
     # for node in self.networkx_graph.nodes:
     #   degree = self.networkx_graph.degree[node]
     #   if degree in degree_distribution:
@@ -384,12 +757,12 @@ class TTR_Graph_Analysis:
     """
     degree_distribution = self.get_node_degree_distribution()
     ax.bar(degree_distribution.keys(), degree_distribution.values(), color=color, **bar_plot_kwargs)
-    x_ticks = get_ticks(1, max(degree_distribution.keys()) + 1, 10)
-    ax.set_xticks(x_ticks)
-    ax.set_xticklabels(x_ticks)
-    y_ticks = get_ticks(0, max(degree_distribution.values()) + 1, 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_ticks)
+    max_degree = max(degree_distribution.keys())
+    max_count = max(degree_distribution.values())
+    x_ticks = get_ticks(1, max_degree + 1, 10)
+    ax.set_xticks(x_ticks, labels=x_ticks)
+    y_ticks = get_ticks(0, max_count + 1, 10)
+    ax.set_yticks(y_ticks, labels=y_ticks)
     ax.set_xlabel("node degree")
     ax.set_ylabel("count")
     ax.set_title("Node degree distribution")
@@ -406,16 +779,11 @@ class TTR_Graph_Analysis:
     Returns:
         dict[int, int]: dictionary of edge lengths and how often they occur in the graph
     """
-    edge_length_distribution = {}
-    for edge in self.networkx_graph.edges:
-      if color is not None and self.networkx_graph.edges[edge]["color"] != color:
-        # skip edges of the wrong color
-        continue
-      length = self.networkx_graph.edges[edge]["length"]
-      if length in edge_length_distribution:
-        edge_length_distribution[length] += 1
-      else:
-        edge_length_distribution[length] = 1
+    distributions = self.compute_all_distributions()
+    if color is None:
+      edge_length_distribution: dict[int, int] = dict(distributions["edge_length"])
+    else:
+      edge_length_distribution: dict[int, int] = dict(distributions["edge_length_by_color"].get(color, {}))
     return edge_length_distribution
 
   def plot_edge_length_distribution(self, ax: plt.Axes, color: str = None, plot_color: str = None, grid_color: str = None, **bar_plot_kwargs):
@@ -435,12 +803,12 @@ class TTR_Graph_Analysis:
       plot_color = "#5588ff"
     edge_length_distribution = self.get_edge_length_distribution(color)
     ax.bar(edge_length_distribution.keys(), edge_length_distribution.values(), color=plot_color, **bar_plot_kwargs)
-    x_ticks = get_ticks(1, max(edge_length_distribution.keys()) + 1, 10)
-    ax.set_xticks(x_ticks)
-    ax.set_xticklabels(x_ticks)
-    y_ticks = get_ticks(0, max(edge_length_distribution.values()) + 1, 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_ticks)
+    max_length = max(edge_length_distribution.keys())
+    max_count = max(edge_length_distribution.values())
+    x_ticks = get_ticks(1, max_length + 1, 10)
+    ax.set_xticks(x_ticks, labels=x_ticks)
+    y_ticks = get_ticks(0, max_count + 1, 10)
+    ax.set_yticks(y_ticks, labels=y_ticks)
     ax.set_xlabel("edge length")
     ax.set_ylabel("count")
     title = "Edge length distribution"
@@ -457,27 +825,10 @@ class TTR_Graph_Analysis:
     Returns:
         dict[str, dict[int, int]]: dictionary of edge colors and their length distributions. See get_edge_length_distribution for the format of the length distributions.
     """
-    edge_color_length_distribution: dict = {}
-    counted_edge_identifiers: set[tuple[str, str, int]] = set()
-    for edge_key, particle_edge in self.edge_particles.items():
-      loc1, loc2, path_index, connection_index = edge_key
-      if (loc1, loc2, connection_index) in counted_edge_identifiers:
-        continue
-      counted_edge_identifiers.add((loc1, loc2, connection_index))
-      color = particle_edge.color
-      # find length by finding max path index
-      length = 0
-      for edge_key2 in self.edge_particles.keys():
-        if edge_key2[0] == loc1 and edge_key2[1] == loc2 and edge_key2[3] == connection_index:
-          length = max(length, edge_key2[2])
-      length += 1
-      if color not in edge_color_length_distribution:
-        edge_color_length_distribution[color] = {}
-      if length in edge_color_length_distribution[color]:
-        edge_color_length_distribution[color][length] += 1
-      else:
-        edge_color_length_distribution[color][length] = 1
-      # edge_color_length_distribution[color][length] = edge_color_length_distribution[color].get(length, 0) + 1
+    # copy so that callers can modify the result without affecting the cache
+    edge_color_length_distribution = {
+      color: dict(length_distribution)
+      for color, length_distribution in self.compute_all_distributions()["edge_color_length"].items()}
     # for edge in self.networkx_graph.edges:
     #   color: str = self.networkx_graph.edges[edge]["color"]
     #   length: int = self.networkx_graph.edges[edge]["length"]
@@ -507,7 +858,8 @@ class TTR_Graph_Analysis:
     edge_color_length_distribution: dict[str, dict[int, int]] = self.get_edge_color_length_distribution()
     if color_map is None:
       color_map = {color: color for color in edge_color_length_distribution}
-    max_length = max([max(edge_color_length_distribution[color].keys()) for color in edge_color_length_distribution])
+    max_length = max([max(length_distribution.keys()) for length_distribution in edge_color_length_distribution.values()])
+    max_count = max([max(length_distribution.values()) for length_distribution in edge_color_length_distribution.values()])
     # add value 0 for missing lengths, then plot
     for color in edge_color_length_distribution:
       for length in range(1, max_length + 1):
@@ -526,11 +878,9 @@ class TTR_Graph_Analysis:
           label=color,
           **plot_kwargs)
     x_ticks = get_ticks(1, max_length + 1, 10)
-    ax.set_xticks(x_ticks)
-    ax.set_xticklabels(x_ticks)
-    y_ticks = get_ticks(0, max([max(edge_color_length_distribution[color].values()) for color in edge_color_length_distribution]) + 1, 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_ticks)
+    ax.set_xticks(x_ticks, labels=x_ticks)
+    y_ticks = get_ticks(0, max_count + 1, 10)
+    ax.set_yticks(y_ticks, labels=y_ticks)
     ax.set_xlabel("edge length")
     ax.set_ylabel("count")
     ax.set_title("Edge length distribution for each color")
@@ -545,10 +895,7 @@ class TTR_Graph_Analysis:
     Returns:
         dict[str, int]: dictionary of edge colors and their counts
     """
-    edge_color_length_distribution = self.get_edge_color_length_distribution()
-    edge_color_distribution = {}
-    for color in edge_color_length_distribution:
-      edge_color_distribution[color] = sum(edge_color_length_distribution[color].values())
+    edge_color_distribution: dict[str, int] = dict(self.compute_all_distributions()["edge_color"])
     return edge_color_distribution
 
   def plot_edge_color_distribution(self, ax: plt.Axes, color_map: dict[str, str] = None, grid_color: str = None, **bar_plot_kwargs):
@@ -570,8 +917,7 @@ class TTR_Graph_Analysis:
         color=[color_map[color] for color in edge_color_distribution],
         **bar_plot_kwargs)
     y_ticks = get_ticks(0, max(edge_color_distribution.values()) + 1, 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_ticks)
+    ax.set_yticks(y_ticks, labels=y_ticks)
     ax.set_xlabel("edge color")
     ax.set_ylabel("count")
     ax.set_title("Edge color distribution")
@@ -585,10 +931,7 @@ class TTR_Graph_Analysis:
     Returns:
         dict[str, int]: dictionary of edge colors and their total lengths
     """
-    edge_color_length_distribution = self.get_edge_color_length_distribution()
-    edge_color_total_length_distribution = {}
-    for color in edge_color_length_distribution:
-      edge_color_total_length_distribution[color] = sum([length * count for length, count in edge_color_length_distribution[color].items()])
+    edge_color_total_length_distribution: dict[str, int] = dict(self.compute_all_distributions()["edge_color_total_length"])
     return edge_color_total_length_distribution
 
   def plot_edge_color_total_length_distribution(self, ax: plt.Axes, color_map: dict[str, str] = None, grid_color: str = None, **bar_plot_kwargs):
@@ -606,8 +949,7 @@ class TTR_Graph_Analysis:
       color_map = {color: color for color in edge_color_total_length_distribution}
     ax.bar(edge_color_total_length_distribution.keys(), edge_color_total_length_distribution.values(), color=[color_map[color] for color in edge_color_total_length_distribution], **bar_plot_kwargs)
     y_ticks = get_ticks(0, max(edge_color_total_length_distribution.values()) + 1, 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_ticks)
+    ax.set_yticks(y_ticks, labels=y_ticks)
     ax.set_xlabel("edge color")
     ax.set_ylabel("total length")
     ax.set_title("Edge color total length distribution")
@@ -621,13 +963,7 @@ class TTR_Graph_Analysis:
     Returns:
         dict[int, int]: dictionary of task lengths and their counts
     """
-    task_points_distribution = {}
-    for task in self.tasks.values():
-      points = task.points
-      if points in task_points_distribution:
-        task_points_distribution[points] += 1
-      else:
-        task_points_distribution[points] = 1
+    task_points_distribution: dict[int, int] = dict(Counter(task.points for task in self.tasks.values()))
     # for length in self.task_lengths.values():
     #   if length in task_length_distribution:
     #     task_length_distribution[length] += 1
@@ -651,12 +987,12 @@ class TTR_Graph_Analysis:
         task_length_distribution.values(),
         color=plot_color,
         **bar_plot_kwargs)
-    x_ticks = get_ticks(1, max(task_length_distribution.keys()), 10)
-    ax.set_xticks(x_ticks)
-    ax.set_xticklabels(x_ticks)
-    y_ticks = get_ticks(0, max(task_length_distribution.values()), 10)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels(y_ticks)
+    max_points = max(task_length_distribution.keys())
+    max_count = max(task_length_distribution.values())
+    x_ticks = get_ticks(1, max_points, 10)
+    ax.set_xticks(x_ticks, labels=x_ticks)
+    y_ticks = get_ticks(0, max_count, 10)
+    ax.set_yticks(y_ticks, labels=y_ticks)
     ax.set_xlabel("task points")
     ax.set_ylabel("count")
     ax.set_title("Task points distribution")
@@ -687,44 +1023,73 @@ class TTR_Graph_Analysis:
           key: color
           value: tuple of average and standard deviation
     """
-    task_color_length_counts: dict[str, dict[int, int]] = {}
     # init dict mapping location pairs to length and list of colors of connections
-    edge_ends_to_colors: dict[Tuple[str, str], List[str]] = {}
-    edge_ends_to_length: dict[Tuple[str, str], int] = {}
-    for edge_key, particle_edge in self.edge_particles.items():
-      loc1, loc2, path_index, connection_index = edge_key
-      if (loc1, loc2) not in edge_ends_to_colors:
-        edge_ends_to_colors[(loc1, loc2)] = [particle_edge.color]
-      if path_index > edge_ends_to_length.get((loc1, loc2), -1):
-        edge_ends_to_length[(loc1, loc2)] = path_index
-      # add color to list of colors if not already in list
-      if not particle_edge.color in edge_ends_to_colors[(loc1, loc2)]:
-        edge_ends_to_colors[(loc1, loc2)].append(particle_edge.color)
-    # add 1 to all edge lengths
-    edge_ends_to_length = {edge_key: length + 1 for edge_key, length in edge_ends_to_length.items()}
+    edge_ends_to_color_set: dict[Tuple[str, str], dict[str, None]] = {} # ordered sets of colors
+    edge_ends_to_max_path_index: dict[Tuple[str, str], int] = {}
+    for (loc1, loc2, path_index, _), particle_edge in self.edge_particles.items():
+      edge_ends = (loc1, loc2)
+      edge_ends_to_color_set.setdefault(edge_ends, {})[particle_edge.color] = None
+      if path_index > edge_ends_to_max_path_index.get(edge_ends, -1):
+        edge_ends_to_max_path_index[edge_ends] = path_index
+    # index location pairs and colors by integers: edge id -> length, possible color ids
+    edge_ids: dict[Tuple[str, str], int] = {edge_ends: i for i, edge_ends in enumerate(edge_ends_to_color_set)}
+    edge_lengths = np.fromiter((edge_ends_to_max_path_index[edge_ends] for edge_ends in edge_ids), dtype=np.int64, count=len(edge_ids))
+    edge_lengths += 1
+    color_ids: dict[str, int] = {}
+    edge_color_ids: List[Tuple[int, ...]] = [
+        tuple(color_ids.setdefault(color, len(color_ids)) for color in colors)
+        for colors in edge_ends_to_color_set.values()]
+    n_edge_colors = np.fromiter((len(colors) for colors in edge_color_ids), dtype=np.int32, count=len(edge_color_ids))
+    first_edge_color_ids = np.fromiter((colors[0] for colors in edge_color_ids), dtype=np.int32, count=len(edge_color_ids))
+    # uniform probabilities to choose each color of an edge, shared by all edges with the same number of colors
+    color_probabilities: dict[int, np.ndarray] = {
+        n_colors: np.full(n_colors, 1 / n_colors) for n_colors in set(n_edge_colors.tolist())}
+    # accumulate count, sum and sum of squares of the sampled lengths for each color while sampling
+    color_counts = np.zeros(len(color_ids))
+    color_sums = np.zeros(len(color_ids))
+    color_square_sums = np.zeros(len(color_ids))
+    sampled_color_order: dict[int, None] = {} # ids of all sampled colors, ordered by their first sampled edge
+    rng = np.random.default_rng()
     for task in self.tasks.values():
       shortest_paths = self.get_all_shortest_paths(loc1=task.node_names[0], loc2=task.node_names[-1])
-      for _ in range(n_random_paths):
-        path, length = random.choice(shortest_paths)
-        for (loc1, loc2) in zip(path[:-1], path[1:]):
-          particle_edge: tuple[str, str] = tuple(sorted([loc1, loc2]))
-          length: int = edge_ends_to_length[particle_edge]
-          color: str = random.choice(edge_ends_to_colors[particle_edge])
-          # color = self.networkx_graph.edges[edge]["color"]
-          # length = self.networkx_graph.edges[edge]["length"]
-          if color not in task_color_length_counts: # initialize dict for color
-            task_color_length_counts[color] = {}
-          if length not in task_color_length_counts[color]: # initialize dict for length
-            task_color_length_counts[color][length] = 0
-          task_color_length_counts[color][length] += 1
-    # calculate average and standard deviation for each color
-    task_color_avg_distribution: dict[str, Tuple(float, float)] = {}
-    for color in task_color_length_counts:
-      # calculate average
-      avg = sum([length * count for length, count in task_color_length_counts[color].items()]) / n_random_paths
-      # calculate standard deviation
-      std = sqrt(sum([((length - avg) ** 2) * count for length, count in task_color_length_counts[color].items()]) / (n_random_paths - 1))
-      task_color_avg_distribution[color] = (avg, std)
+      # look up the edge ids of each path once per path instead of once per sample
+      path_edge_ids: List[np.ndarray] = [
+          np.fromiter((edge_ids[(loc1, loc2) if loc1 <= loc2 else (loc2, loc1)] for loc1, loc2 in zip(path[:-1], path[1:])), dtype=np.int32, count=len(path) - 1)
+          for path, _ in shortest_paths]
+      # draw how often each path is chosen in `n_random_paths` uniform samples at once, then handle each distinct path only once
+      path_counts = rng.multinomial(n_random_paths, np.full(len(path_edge_ids), 1 / len(path_edge_ids)))
+      for edge_id_array, path_count in zip(path_edge_ids, path_counts.tolist()):
+        if path_count == 0:
+          continue
+        single_color = n_edge_colors[edge_id_array] == 1
+        single_color_ids = first_edge_color_ids[edge_id_array[single_color]]
+        single_color_lengths = edge_lengths[edge_id_array[single_color]]
+        np.add.at(color_counts, single_color_ids, path_count)
+        np.add.at(color_sums, single_color_ids, path_count * single_color_lengths)
+        np.add.at(color_square_sums, single_color_ids, path_count * single_color_lengths * single_color_lengths)
+        sampled_color_order.update(dict.fromkeys(single_color_ids.tolist()))
+        for edge_id in edge_id_array[~single_color].tolist():
+          # choose one of the colors (uniformly) randomly for each sampled path
+          candidate_color_ids = edge_color_ids[edge_id]
+          length = edge_lengths[edge_id]
+          color_path_counts = rng.multinomial(path_count, color_probabilities[len(candidate_color_ids)])
+          for color_id, color_path_count in zip(candidate_color_ids, color_path_counts.tolist()):
+            if color_path_count == 0:
+              continue
+            color_counts[color_id] += color_path_count
+            color_sums[color_id] += color_path_count * length
+            color_square_sums[color_id] += color_path_count * length * length
+            sampled_color_order[color_id] = None
+    colors: List[str] = list(color_ids)
+    # calculate average and standard deviation for all colors at once
+    sampled_color_ids = np.fromiter(sampled_color_order, dtype=np.int32, count=len(sampled_color_order))
+    length_sums = color_sums[sampled_color_ids]
+    avgs = length_sums / n_random_paths
+    # standard deviation: sum((length - avg)^2) expanded into the accumulated sums
+    squared_deviations = color_square_sums[sampled_color_ids] - 2 * avgs * length_sums + avgs * avgs * color_counts[sampled_color_ids]
+    stds = np.sqrt(np.maximum(0, squared_deviations) / (n_random_paths - 1))
+    task_color_avg_distribution: dict[str, Tuple(float, float)] = {
+        colors[color_id]: (avg, std) for color_id, avg, std in zip(sampled_color_ids.tolist(), avgs.tolist(), stds.tolist())}
 
     return task_color_avg_distribution
 
@@ -761,6 +1126,58 @@ class TTR_Graph_Analysis:
       ax.grid(axis="y", color=grid_color)
 
 
+_edge_importance_worker_data: tuple = None # (sparse graph, task start indices, task end indices, original task lengths) of a worker process
+
+def _init_edge_importance_worker(csr_graph: csr_matrix, start_indices: np.ndarray, end_indices: np.ndarray, original_lengths: np.ndarray):
+  """
+  Store the data shared by all edge removals in a worker process of `TTR_Graph_Analysis.get_edge_importance`.
+  """
+  global _edge_importance_worker_data
+  _edge_importance_worker_data = (csr_graph, start_indices, end_indices, original_lengths)
+
+def _edge_importance_worker(payload: Tuple[int, List[int]]) -> float:
+  """
+  Calculate the maximum task length increase caused by removing one edge from the sparse graph of a worker process.
+
+  Args:
+      payload (Tuple[int, List[int]]): index of the edge in the `data` array of the sparse matrix and positions of the tasks using that edge
+
+  Returns:
+      float: the maximum task length increase
+  """
+  csr_graph, start_indices, end_indices, original_lengths = _edge_importance_worker_data
+  data_index, task_positions = payload
+  original_length = csr_graph.data[data_index]
+  csr_graph.data[data_index] = np.inf
+  try:
+    sources, source_rows = np.unique(start_indices[task_positions], return_inverse=True)
+    distances = dijkstra(csr_graph, directed=False, indices=sources)
+  finally:
+    csr_graph.data[data_index] = original_length
+  increases = distances[source_rows, end_indices[task_positions]] - original_lengths[task_positions]
+  increases = increases[increases > 0] # also drops nan from tasks that were unreachable before
+  if len(increases) == 0:
+    return 0
+  max_increase = increases.max()
+  return int(max_increase) if np.isfinite(max_increase) else float("inf")
+
+def _build_shortest_paths(predecessors: dict[str, List[str]], loc1: str, loc2: str) -> List[List[str]]:
+  """
+  Build all shortest paths from `loc1` to `loc2` by following the given predecessors backwards from `loc2`. Paths are returned in the same order as `nx.all_shortest_paths`.
+
+  Args:
+      predecessors (dict[str, List[str]]): predecessors of each location on shortest paths starting at `loc1`
+      loc1 (str): start location
+      loc2 (str): end location
+
+  Returns:
+      List[List[str]]: all shortest paths from `loc1` to `loc2`
+  """
+  if loc2 == loc1:
+    return [[loc1]]
+  return [path + [loc2] for predecessor in predecessors[loc2] for path in _build_shortest_paths(predecessors, loc1, predecessor)]
+
+
 def create_nx_graph(locations: List[str], edge_particles: dict[Tuple[str, str, int, int], Particle_Edge]) -> nx.Graph:
   """
   create a networkx graph from locations and paths
@@ -776,25 +1193,38 @@ def create_nx_graph(locations: List[str], edge_particles: dict[Tuple[str, str, i
   nx_graph = nx.Graph()
   # Add nodes and edges to the graph
   nx_graph.add_nodes_from(locations)
-  # determine all connections in the graph from edge particle dict
-  for (loc1, loc2, path_index, connection_index) in edge_particles:
-    if path_index != 0:
-      continue
-    # get length of connection
-    length = 0
-    while True:
-      if (loc1, loc2, length+1, connection_index) not in edge_particles:
-        break
-      length += 1
-    length += 1
+  # count particles and track the largest path index of each connection in a single pass over the edge particle dict
+  connection_sizes: dict[Tuple[str, str, int], List[int]] = {} # connection -> [number of particles, largest path index]
+  first_particle_keys: List[Tuple[str, str, int, int]] = [] # keys of the first particle of each connection in dict order
+  for particle_key in edge_particles:
+    loc1, loc2, path_index, connection_index = particle_key
+    connection_size = connection_sizes.get((loc1, loc2, connection_index))
+    if connection_size is None:
+      connection_sizes[(loc1, loc2, connection_index)] = [1, path_index]
+    else:
+      connection_size[0] += 1
+      if path_index > connection_size[1]:
+        connection_size[1] = path_index
+    if path_index == 0:
+      first_particle_keys.append(particle_key)
+  # determine all connections in the graph
+  for particle_key in first_particle_keys:
+    loc1, loc2, _, connection_index = particle_key
+    # get length of connection: number of consecutive path indices starting at 0
+    length, max_path_index = connection_sizes[(loc1, loc2, connection_index)]
+    if max_path_index != length - 1: # gap in the path indices
+      length = 1
+      while (loc1, loc2, length, connection_index) in edge_particles:
+        length += 1
     # get color of connection
-    color = edge_particles[(loc1, loc2, path_index, connection_index)].color
+    color = edge_particles[particle_key].color
     nx_graph.add_edge(loc1, loc2, key=connection_index, length=length, color=color)
   return nx_graph
 
+@lru_cache(maxsize=256)
 def get_ticks(min_val: float, max_val: float, max_n_ticks: int = 10, int_ticks: bool = True):
   """
-  get ticks for a plot
+  get ticks for a plot. Results are cached and returned as read-only arrays.
 
   Args:
       min_val (float): minimum value
@@ -808,10 +1238,13 @@ def get_ticks(min_val: float, max_val: float, max_n_ticks: int = 10, int_ticks:
   # get ticks
   if not int_ticks:
     ticks = np.linspace(min_val, max_val, max_n_ticks)
-    return ticks
-
-  tick_step = max(1, int((max_val - min_val) // max_n_ticks))
-  ticks = np.arange(min_val, max_val + 1, tick_step)
+  else:
+    tick_step = max(1, int((max_val - min_val) // max_n_ticks))
+    if float(min_val).is_integer() and float(max_val).is_integer(): # whole number bounds: integer ticks
+      ticks = np.arange(int(min_val), int(max_val) + 1, tick_step, dtype=np.int32)
+    else:
+      ticks = np.arange(min_val, max_val + 1, tick_step)
+  ticks.flags.writeable = False # shared between calls with the same arguments
   return ticks
 
 
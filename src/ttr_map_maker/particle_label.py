@@ -4,7 +4,8 @@ There is an attraction force between the node and target position as well as bet
 
 A node can be connected to other nodes by edges.
 """
-from typing import Tuple
+from functools import lru_cache
+from typing import List, Tuple
 
 from PIL import Image, ImageFont, ImageDraw
 import numpy as np
@@ -68,17 +69,12 @@ class Particle_Label(Graph_Particle):
     if font_name is None:
       # font_name = font_path.split("\\")[-1].strip(".ttf")
       fontManager.addfont(font_path)
-      width, height, pix_width, pix_height, *offset = self._get_label_size(
-          label = label,
-          fontsize = fontsize,
-          font = font_path)
+      self._load_font(font_path, fontsize)
       self.font_name = font_path
     else:
-      width, height, pix_width, pix_height, *offset = self._get_label_size(
-          label = label,
-          fontsize = fontsize,
-          font = font_name)
+      self._load_font(font_name, fontsize)
       self.font_name = font_name
+    width, height, pix_width, pix_height, *offset = self._get_label_size(label)
     super().__init__(
         id,
         position=position,
@@ -95,6 +91,8 @@ class Particle_Label(Graph_Particle):
     self.height_pixels = pix_height
     self.text_x_offset = offset[0]
     self.text_y_offset = offset[1]
+    self._outline_image_key: tuple = None # arguments of `render_label_outline` used for `self._outline_image`
+    self._outline_image: Image = None # last rendered label image, reused while the label does not change
 
 
   def get_attraction_force(self, other: Particle_Node) -> Tuple[np.ndarray, np.ndarray]:
@@ -157,10 +155,7 @@ class Particle_Label(Graph_Particle):
       if self.ignore_linebreaks:
         self.label = self.label.replace("\n", " ")
       # update bounding box size
-      width, height, pix_width, pix_height, *offset = self._get_label_size(
-          new_label,
-          self.fontsize,
-          self.font_path)
+      width, height, pix_width, pix_height, *offset = self._get_label_size(new_label)
       self.bounding_box_size = (width, height)
       self.width_pixels = pix_width
       self.height_pixels = pix_height
@@ -188,10 +183,8 @@ class Particle_Label(Graph_Particle):
       self.fontsize = font_size
     if font_path is not None:
       self.font_path = font_path
-    width, height, pix_width, pix_height, *offset = self._get_label_size(
-        label = self.label,
-        fontsize = self.fontsize,
-        font = self.font_path)
+    self._load_font(self.font_path, self.fontsize)
+    width, height, pix_width, pix_height, *offset = self._get_label_size(self.label)
     self.bounding_box_size = (width, height)
     self.width_pixels = pix_width
     self.height_pixels = pix_height
@@ -208,7 +201,8 @@ class Particle_Label(Graph_Particle):
       scale: float = 1,
       override_position: np.ndarray = None,
       movable: bool = True,
-      debug: bool = False) -> None:
+      debug: bool = False,
+      extent: Tuple[float, float, float, float] = None) -> None:
     """
     draw the particle on the canvas.
     If a border color is given, the label text will have an outline with the given color.
@@ -219,6 +213,7 @@ class Particle_Label(Graph_Particle):
         border_color (str, optional): background color of the label. Defaults to None.
         alpha (float, optional): alpha value of the particle. Defaults to 0.7.
         zorder (int, optional): zorder of the particle. Defaults to 4.
+        extent (Tuple[float, float, float, float], optional): precomputed extent of the label, see `get_label_extents`. Defaults to None (calculate from `scale` and `override_position`).
     """
     if color is None:
       color = self.color
@@ -250,7 +245,7 @@ class Particle_Label(Graph_Particle):
     
     text_image = self.draw_label_outline(text_image_size, color, border_color)
 
-    label_extent = self.get_extent(scale, override_position)
+    label_extent = self.get_extent(scale, override_position) if extent is None else extent
     self.plotted_objects.append(ax.imshow(
         text_image,
         extent=label_extent,
@@ -263,20 +258,21 @@ class Particle_Label(Graph_Particle):
       text_image_size: Tuple[int, int],
       inner_color: str = "#dddddd",
       border_color: str = "#222222") -> Image:
-    
-    outline_image = Image.new("RGBA", text_image_size, (0,0,0,0))
-    text_draw = ImageDraw.Draw(outline_image)
-    text_draw.text(
-        # (50, -50),
-        (self.text_x_offset, self.text_y_offset),
+    """
+    render the label text with an outline. The last rendered image is kept and reused by redraws of an unchanged label, so it must not be modified.
+    """
+    outline_image_key = (
         self.label,
-        align="center",
-        font=self.img_font,
-        fill=inner_color,
-        stroke_width=self.outline_stroke_width,
-        stroke_fill=border_color)
-
-    return outline_image
+        tuple(text_image_size),
+        (self.text_x_offset, self.text_y_offset),
+        inner_color,
+        border_color,
+        self.img_font,
+        self.outline_stroke_width)
+    if outline_image_key != self._outline_image_key:
+      self._outline_image = render_label_outline(*outline_image_key)
+      self._outline_image_key = outline_image_key
+    return self._outline_image
 
   def get_extent(self, scale: float = 1, override_position: np.ndarray = None) -> Tuple[float, float, float, float]:
     """
@@ -298,60 +294,39 @@ class Particle_Label(Graph_Particle):
         override_position[1] + self.bounding_box_size[1] / 2 * scale)
 
 
-  def _get_label_size(self, label: str, fontsize: int, font: str, image_padding: int = 0.3) -> Tuple[float, float, float, float]:
+  def _load_font(self, font: str, fontsize: int) -> None:
     """
-    get size of a label with a given font size
+    load the font used to measure and render the label into `self.img_font`
 
     Args:
-        label (str): text of the label
-        fontsize (int): fontsize of the label
         font (str): name or path of the font to use
-        image_padding (int): number of pixels to add to width and height in each direction as padding to ensure text is not cut off. Defaults to 0.3 (30%)
+        fontsize (int): fontsize of the label
+    """
+    self.img_font = load_font(font, fontsize)
+
+  def _get_label_size(self, label: str, image_padding: int = 0.3) -> Tuple[float, float, int, int, int, int]:
+    """
+    get size of a label with the current font (see `_load_font`). See `get_label_size` for details.
+
+    Args:
+        label (str): text of the label
+        image_padding (int): padding relative to the text size. Defaults to 0.3 (30%)
 
     Returns:
-        float: width of the label, normalized to height=1
-        float: height of the label, always 1
-        int: width in pixels
-        int: height in pixels
-        int: x offset for text in image in pixels
-        int: y offset for text in image in pixels
+        Tuple[float, float, int, int, int, int]: width, height, width in pixels, height in pixels, x and y offset of the text in pixels
     """
-    if ".ttf" in font:
-      self.img_font = ImageFont.truetype(font, fontsize)
-    else:
-      # load installed font
-      self.img_font = ImageFont.load(font)
-      self.img_font.set_size(fontsize)
-    # calculate bounding box of outline stroke
-    bbox_size = get_multiline_bbox_size(label, self.img_font, stroke_width=self.outline_stroke_width)
-    width_pixels, height_pixels = bbox_size
-    # add padding
-    width_pixels = int(width_pixels + image_padding*width_pixels)
-    height_pixels = int(height_pixels + image_padding*height_pixels)
-    # calculate bounding box of inside stroke
-    # bbox_size = get_multiline_bbox_size(label, self.img_font, stroke_width=self.inside_stroke_width)
-    small_width_pixels, small_height_pixels = bbox_size
-    # calculate offsets of inner text
-    text_x_offset = (width_pixels - small_width_pixels)//2
-    text_y_offset = (height_pixels - small_height_pixels)//2
-    # text_x_offset = image_padding // 2
-    # text_y_offset = -image_padding // 2
-    # normalize height
-    # line_count: int = label.count("\n") + 1
-    width = width_pixels * self.height_scale_factor# * line_count
-    height = height_pixels * self.height_scale_factor# * line_count
-
-    return width, height, width_pixels, height_pixels, text_x_offset, text_y_offset
+    return get_label_size(label, self.img_font, self.outline_stroke_width, self.height_scale_factor, image_padding)
 
 
 
+  @lru_cache(maxsize=32)
   def get_label_height_scale(
       fontsize: int = 250,
       font_name: str = None,
       font_path: str = None) -> float:
       # font_path: str = "beleriand_ttr\\MiddleEarth.ttf") -> float:
     """
-    calculate a scale factor to be used for all labels to normalize their height but keep all text the same size.
+    calculate a scale factor to be used for all labels to normalize their height but keep all text the same size. Results are cached.
     This is necessary because a label "Xy" being scaled to the same height as "xx", would result in a much smaller fontsize because of the capital letter and low reaching y.
 
     Args:
@@ -367,11 +342,10 @@ class Particle_Label(Graph_Particle):
       font_name = "assets/fonts/Stamp.ttf"
     # load image_font from file
     if font_name is None:
-      img_font = ImageFont.truetype(font_path, fontsize)
+      img_font = load_font(font_path, fontsize)
     else:
       # load installed font
-      img_font = ImageFont.load(font_name)
-      img_font.set_size(fontsize)
+      img_font = load_font(font_name, fontsize, installed=True)
     # determine sroke widths
     text = "ABCDEFGHIJKLMNOPQRSTUVWXYZ-abcdefghijklmnopqrstuvwxyz_0123456789"
     outline_stroke_width = fontsize // 8
@@ -400,9 +374,130 @@ class Particle_Label(Graph_Particle):
 
 
 
+def get_label_extents(labels: List[Particle_Label], scale: float = 1) -> np.ndarray:
+  """
+  get the extents of many labels at once. Equivalent to calling `get_extent` on each label, but computed with a single vectorized operation.
+
+  Args:
+      labels (List[Particle_Label]): labels to get the extents of
+      scale (float, optional): scale of the bounding boxes. Defaults to 1.
+
+  Returns:
+      np.ndarray: array of shape (len(labels), 4) with one extent (left, right, bottom, top) per label
+  """
+  if not labels:
+    return np.empty((0, 4))
+  positions = np.array([label.position for label in labels], dtype=np.float64)
+  half_sizes = np.array([label.bounding_box_size for label in labels], dtype=np.float64) / 2 * scale
+  return np.column_stack((
+      positions[:, 0] - half_sizes[:, 0],
+      positions[:, 0] + half_sizes[:, 0],
+      positions[:, 1] - half_sizes[:, 1],
+      positions[:, 1] + half_sizes[:, 1]))
+
+@lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int, installed: bool = None) -> ImageFont.ImageFont:
+  """
+  load a font with the given size. Fonts are cached, so every label using the same font and size shares one font object.
+
+  Args:
+      font (str): path to a `.ttf` font file or name of an installed font
+      fontsize (int): font size
+      installed (bool, optional): whether `font` is the name of an installed font. Defaults to None (installed unless `font` contains ".ttf").
+
+  Returns:
+      ImageFont.ImageFont: the loaded font
+  """
+  if installed is None:
+    installed = ".ttf" not in font
+  if not installed:
+    return ImageFont.truetype(font, fontsize)
+  # load installed font
+  img_font = ImageFont.load(font)
+  img_font.set_size(fontsize)
+  return img_font
+
+def render_label_outline(
+    label: str,
+    text_image_size: Tuple[int, int],
+    text_offset: Tuple[int, int],
+    inner_color: str,
+    border_color: str,
+    img_font: ImageFont,
+    stroke_width: int) -> Image:
+  """
+  render a label with an outline onto a transparent image.
+
+  Args:
+      label (str): label text. May contain `\n` for new lines.
+      text_image_size (Tuple[int, int]): (width, height) of the image in px
+      text_offset (Tuple[int, int]): position of the text in the image in px
+      inner_color (str): color of the text
+      border_color (str): color of the outline
+      img_font (ImageFont): font to use, ideally loaded with `load_font`
+      stroke_width (int): width of the outline in px
+
+  Returns:
+      Image: rendered label
+  """
+  outline_image = Image.new("RGBA", text_image_size, (0,0,0,0))
+  text_draw = ImageDraw.Draw(outline_image)
+  text_draw.text(
+      text_offset,
+      label,
+      align="center",
+      font=img_font,
+      fill=inner_color,
+      stroke_width=stroke_width,
+      stroke_fill=border_color)
+  return outline_image
+
+@lru_cache(maxsize=4096)
+def get_label_size(
+    label: str,
+    img_font: ImageFont,
+    stroke_width: int,
+    height_scale_factor: float,
+    image_padding: int = 0.3) -> Tuple[float, float, int, int, int, int]:
+  """
+  get size of a label with a given font. Results are cached, which works best with fonts from `load_font`.
+
+  Args:
+      label (str): text of the label
+      img_font (ImageFont): font to use
+      stroke_width (int): width of the label's outline stroke in px
+      height_scale_factor (float): scale factor from px to plot units, see `Particle_Label.get_label_height_scale`
+      image_padding (int): number of pixels to add to width and height in each direction as padding to ensure text is not cut off. Defaults to 0.3 (30%)
+
+  Returns:
+      float: width of the label, normalized to height=1
+      float: height of the label, always 1
+      int: width in pixels
+      int: height in pixels
+      int: x offset for text in image in pixels
+      int: y offset for text in image in pixels
+  """
+  # calculate bounding box of outline stroke
+  bbox_size = get_multiline_bbox_size(label, img_font, stroke_width=stroke_width)
+  width_pixels, height_pixels = bbox_size
+  # add padding
+  width_pixels = int(width_pixels + image_padding*width_pixels)
+  height_pixels = int(height_pixels + image_padding*height_pixels)
+  # calculate bounding box of inside stroke
+  small_width_pixels, small_height_pixels = bbox_size
+  # calculate offsets of inner text
+  text_x_offset = (width_pixels - small_width_pixels)//2
+  text_y_offset = (height_pixels - small_height_pixels)//2
+  # normalize height
+  width = width_pixels * height_scale_factor
+  height = height_pixels * height_scale_factor
+
+  return width, height, width_pixels, height_pixels, text_x_offset, text_y_offset
+
+@lru_cache(maxsize=4096)
 def get_multiline_bbox_size(label: str, img_font: ImageFont, stroke_width: int) -> Tuple[int, int]:
   """
-  get the bounding box size (width, height) of a (multiline) label in px.
+  get the bounding box size (width, height) of a (multiline) label in px. Results are cached, which works best with fonts from `load_font`.
 
   Args:
       label (str): string to get bounding box size of. May contain `\n` for new lines.
@@ -412,6 +507,9 @@ def get_multiline_bbox_size(label: str, img_font: ImageFont, stroke_width: int)
   Returns:
       tuple[int]: (width, height) of the bounding box in px
   """
+  if "\n" not in label: # single line: measure directly without splitting
+    left, top, right, bottom = img_font.getbbox(label, stroke_width=stroke_width)
+    return abs(right - left), abs(bottom - top)
   width_pixels: int = 0
   height_pixels: int = 0
   height_multiplier: float = 1 # used to add line spacing
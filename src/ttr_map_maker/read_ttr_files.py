@@ -1,6 +1,7 @@
 """
 this module contains functions to read the input files for TTR maps represented as graphs
 """
+import gzip
 import pickle
 import json
 
@@ -39,16 +40,14 @@ def read_paths(path_file: str):
   Returns:
       List[Tuple[str, str, int, str]]: list of edges as tuples of two location names, path lengths and a color name
   """
-  paths = []
   try:
-    with open(path_file, "r") as path_file:
-      for line in path_file:
-        line = line.strip()
-        if line:
-          loc_id1, loc_id2, length, color = line.split(" ; ")
-          paths.append((loc_id1, loc_id2, int(length), color))
+    with open(path_file, "r") as file:
+      lines = file.read().splitlines()
   except FileNotFoundError:
     print(f"Warning: could not read paths from {path_file}")
+    return []
+  rows = [line.split(" ; ") for line in map(str.strip, lines) if line] # skip empty lines
+  paths = [(loc_id1, loc_id2, int(length), color) for loc_id1, loc_id2, length, color in rows]
   return paths
 
 
@@ -65,20 +64,21 @@ def read_tasks(task_filepath: str) -> dict[str, TTR_Task]:
   tasks: dict[str, TTR_Task] = {}
   try:
     with open(task_filepath, "r") as task_file:
-      for line in task_file:
-        line = line.strip()
-        if line:
-          loc_1, loc_2, *length = line.split(" ; ")
-          task = TTR_Task(node_names=[loc_1, loc_2])
-          tasks[task.name] = task
+      lines = task_file.read().splitlines()
   except FileNotFoundError:
     print(f"Warning: could not read tasks from {task_filepath}")
+    return tasks
+  for loc_1, loc_2, *length in [line.split(" ; ") for line in map(str.strip, lines) if line]: # skip empty lines
+    task = TTR_Task(node_names=[loc_1, loc_2])
+    tasks[task.name] = task
   return tasks
 
 
+GZIP_MAGIC_NUMBER: bytes = b"\x1f\x8b" # first bytes of every gzip file
+
 def load_particle_graph_pickle(particle_graph_file):
   """
-  load a particle graph from a pickle file
+  load a particle graph from a pickle file. Both plain and gzip-compressed pickle files (see `save_particle_graph_pickle`) are supported.
 
   Args:
       particle_graph_file (str): path to the pickle file
@@ -87,6 +87,25 @@ def load_particle_graph_pickle(particle_graph_file):
       ParticleGraph: particle graph
   """
   with open(particle_graph_file, "rb") as file:
-    particle_graph = pickle.load(file)
+    data = file.read()
+  if data.startswith(GZIP_MAGIC_NUMBER):
+    data = gzip.decompress(data)
+  particle_graph = pickle.loads(data)
 
   return particle_graph
+
+
+def save_particle_graph_pickle(particle_graph: TTR_Particle_Graph, particle_graph_file: str, compress: bool = True):
+  """
+  save a particle graph to a pickle file using pickle protocol 5
+
+  Args:
+      particle_graph (TTR_Particle_Graph): particle graph to save
+      particle_graph_file (str): path to the pickle file
+      compress (bool, optional): whether to compress the file with gzip. Defaults to True.
+  """
+  data = pickle.dumps(particle_graph, protocol=5)
+  if compress:
+    data = gzip.compress(data, compresslevel=1) # fast compression, loading is dominated by decompression anyway
+  with open(particle_graph_file, "wb") as file:
+    file.write(data)
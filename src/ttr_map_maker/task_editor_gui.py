@@ -61,6 +61,7 @@ class Task_Editor_GUI:
     self.max_pick_range: float = max_pick_range
 
     self.networkx_graph: nx.Graph = create_nx_graph(self.particle_graph.get_locations(), self.particle_graph.particle_edges)
+    self._shortest_path_lengths: dict[str, dict[str, int]] = {} # start location -> shortest path lengths to all reachable locations in `self.networkx_graph`
 
     # save grid padding for later use
     self.grid_pad_x: int = grid_padding[0]
@@ -434,7 +435,7 @@ class Task_Editor_GUI:
     if len(task.node_names) < 2:
       return 0
     elif len(task.node_names) == 2:# or not include_bonus_points:
-      return nx.shortest_path_length(self.networkx_graph, task.node_names[0], task.node_names[-1], weight="length")
+      return self.get_shortest_path_length(task.node_names[0], task.node_names[-1])
     elif len(task.node_names) > 2 and not include_bonus_points:
       # TODO: implement optimal Steiner-Tree solver: https://chatgpt.com/share/39b0e6c3-fd1f-4828-bc54-b70631aaf692
       min_length_to_connect_nodes: int = nx.algorithms.approximation.steiner_tree(self.networkx_graph, task.node_names, weight="weight", method="mehlhorn").size("length")
@@ -442,9 +443,32 @@ class Task_Editor_GUI:
     else: # return sum of all path lengths between all nodes assuming them to be ordered to achieve the shortest path
       length: int = 0
       for node_1, node_2 in zip(task.node_names[:-1], task.node_names[1:]):
-        length += nx.shortest_path_length(self.networkx_graph, node_1, node_2, weight="length")
+        length += self.get_shortest_path_length(node_1, node_2)
       return length
 
+  def get_shortest_path_length(self, loc1: str, loc2: str) -> int:
+    """
+    Get the length of the shortest path between two locations in `self.networkx_graph`.
+    Shortest path lengths from `loc1` to all locations are calculated with a single dijkstra run and cached, so tasks sharing locations reuse them.
+
+    Args:
+        loc1 (str): start location
+        loc2 (str): end location
+
+    Returns:
+        int: length of the shortest path
+
+    Raises:
+        nx.NetworkXNoPath: if there is no path between the locations
+    """
+    path_lengths = self._shortest_path_lengths.get(loc1)
+    if path_lengths is None:
+      path_lengths = nx.single_source_dijkstra_path_length(self.networkx_graph, loc1, weight="length")
+      self._shortest_path_lengths[loc1] = path_lengths
+    if loc2 not in path_lengths:
+      raise nx.NetworkXNoPath(f"Node {loc2} not reachable from {loc1}")
+    return path_lengths[loc2]
+
   def calculate_update_task_length(self, task: TTR_Task, task_points_vars: List[tk.IntVar]):
     """
     Calculates the length of the given task and updates the task length label accordingly.
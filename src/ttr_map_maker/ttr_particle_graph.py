@@ -7,6 +7,9 @@ Each edge has a length and a color. Each node has a label close to it.
 A particle graph's layout can be optimized using a simple particle method.
 """
 import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Dict, Union, Any
 from math import isinf
 
@@ -16,7 +19,7 @@ import matplotlib.pyplot as plt
 
 from graph_particle import Graph_Particle
 from particle_node import Particle_Node
-from particle_label import Particle_Label
+from particle_label import Particle_Label, get_label_extents
 from particle_edge import Particle_Edge
 from graph_analysis import TTR_Graph_Analysis
 from ttr_task import TTR_Task
@@ -74,6 +77,7 @@ class TTR_Particle_Graph:
         project_setup (dict, optional): dictionary of project setup parameters, including bg image path, size, task export settings, etc. Defaults to None (create default setup)
     """
     self.color_config: dict = color_config
+    self._paths_dirty: bool = False # set when edge particles are added. `paths` is then rebuilt on next access.
     self.paths: List[Tuple[str, str, int, str]] = paths
     if tasks and isinstance(tasks, (list, tuple)) and isinstance(tasks[0], (tuple, list)):
       self.tasks: dict[str, TTR_Task] = {}
@@ -97,6 +101,10 @@ class TTR_Particle_Graph:
     self.particle_nodes: dict[str, Particle_Node] = dict()
     self.particle_edges: dict[Tuple[str, str, int, int], Particle_Edge] = dict()
     self.particle_labels: dict[str, Particle_Label] = dict()
+    # insertion-ordered lists of the same particles for fast iteration. The dicts above are only used for lookup.
+    self._nodes_list: List[Particle_Node] = list()
+    self._edges_list: List[Particle_Edge] = list()
+    self._labels_list: List[Particle_Label] = list()
     self.analysis_graph: TTR_Graph_Analysis = None
 
     self.graph_extent: np.ndarray = np.array([0, 0, 0, 0], dtype=np.float16)
@@ -106,6 +114,20 @@ class TTR_Particle_Graph:
     self.create_particle_system()
 
 
+  @property
+  def paths(self) -> List[Tuple[str, str, int, str]]:
+    """
+    list of all paths in the particle graph as tuples (location_1, location_2, length, color). If edge particles were added since the last access, the list is rebuilt from the edges first.
+    """
+    if self._paths_dirty:
+      self.build_paths()
+    return self._paths
+
+  @paths.setter
+  def paths(self, paths: List[Tuple[str, str, int, str]]) -> None:
+    self._paths = paths
+    self._paths_dirty = False
+
   def setup_project_dict(self) -> dict:
     project_setup_dict: dict = {
         # "bg_image_settings": {
@@ -294,6 +316,7 @@ class TTR_Particle_Graph:
     particle_id: int = self.max_particle_id + 1
     self.label_height_scale: float = Particle_Label.get_label_height_scale(font_path=self.project_setup_dict.get("label_font", "assets/fonts/Stamp.ttf"))
     n_nodes: int = len(self.node_labels)
+    label_gap: np.ndarray = np.array([1, 0], dtype=np.float16) # gap between node and label
     for path_index, label in enumerate(self.node_labels):
       if self.node_positions is not None:
         position = self.node_positions[label]
@@ -321,8 +344,10 @@ class TTR_Particle_Graph:
           height_scale_factor=self.label_height_scale,
           )
       self.particle_labels[label].position = \
-          self.particle_nodes[label].position + np.array([self.particle_labels[label].bounding_box_size[0] / 2, 0], dtype=np.float16) + np.array([1, 0], dtype=np.float16)
+          self.particle_nodes[label].position + np.array([self.particle_labels[label].bounding_box_size[0] / 2, 0], dtype=np.float16) + label_gap
       self.particle_labels[label].add_connected_particle(self.particle_nodes[label])
+      self._nodes_list.append(self.particle_nodes[label])
+      self._labels_list.append(self.particle_labels[label])
       particle_id += 1
       # print(f"node position {label}: {self.particle_nodes[label].position}")
       # print(f"label position {label}: {self.particle_labels[label].position}")
@@ -337,27 +362,49 @@ class TTR_Particle_Graph:
 
   def optimize_layout(self,
       iterations: int = 1000,
-      dt: float = 0.02) -> None:
+      dt: float = 0.02,
+      n_workers: int = 1) -> None:
     """
     optimize layout of particle graph by calling the interact() and update() methods of each particle.
     Use Cell lists and Verlet lists to speed up the computation.
 
+    `interact()` only changes the acceleration of the calling particle, so the interactions of different particles within one timestep are independent of each other. With `n_workers > 1` they are split into chunks and calculated in a thread pool.
+
     Args:
         iterations (int, optional): number of iterations to perform. Defaults to 1000.
         dt (float, optional): timestep. Defaults to 0.02.
+        n_workers (int, optional): number of threads used to calculate particle interactions. Use `None` for one thread per CPU core. Defaults to 1 (no threading).
     """
     all_particles = self.get_particle_list()
-    for i in range(iterations):
-      for particle in all_particles:
-        particle.reset_acceleration()
-
-      for particle_1 in all_particles:
+    if n_workers is None:
+      n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(all_particles)))
+    chunk_size = max(1, -(-len(all_particles) // n_workers)) # ceil division
+    particle_chunks = [all_particles[i:i+chunk_size] for i in range(0, len(all_particles), chunk_size)]
+
+    def interact_chunk(particle_chunk: List[Graph_Particle]) -> None:
+      for particle_1 in particle_chunk:
         for particle_2 in all_particles:
           if particle_1 != particle_2:
             particle_1.interact(particle_2)
 
-      for particle in all_particles:
-        particle.update(dt)
+    executor = ThreadPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    try:
+      for i in range(iterations):
+        for particle in all_particles:
+          particle.reset_acceleration()
+
+        if executor is None:
+          interact_chunk(all_particles)
+        else:
+          # consume the iterator to wait for all chunks and re-raise exceptions
+          list(executor.map(interact_chunk, particle_chunks))
+
+        for particle in all_particles:
+          particle.update(dt)
+    finally:
+      if executor is not None:
+        executor.shutdown()
 
   def set_graph_extent(self, graph_extent: np.ndarray) -> None:
     """
@@ -382,8 +429,9 @@ class TTR_Particle_Graph:
         x_offset (float, optional): x offset. Defaults to 0..
         y_offset (float, optional): y offset. Defaults to 2.
     """
-    for particle_label in self.particle_labels.values():
-      particle_label.position = particle_label.connected_particles[0].position + np.array([x_offset, y_offset], dtype=np.float16)
+    offset: np.ndarray = np.array([x_offset, y_offset], dtype=np.float16)
+    for particle_label in self._labels_list:
+      particle_label.position = particle_label.connected_particles[0].position + offset
       particle_label.erase()
       particle_label.draw(ax, movable=movable)
 
@@ -498,6 +546,7 @@ class TTR_Particle_Graph:
         break
     # define offset vector for multiple connections
     offset_vec: np.ndarray = offset_normal_vec * min(edge_particles[0].bounding_box_size)
+    new_rotation = np.arctan2(node_distance_vec[1], node_distance_vec[0])
     # reposition the edge particles
     for i, edge_particle in enumerate(edge_particles):
       # calculate new position through linear interpolation along node_distance_vec
@@ -511,8 +560,6 @@ class TTR_Particle_Graph:
       # avoid overlap of multiple connections between the same nodes by offsetting the particles
       new_position += offset_vec * (connection_index - max_connection_index / 2)
       edge_particle.set_position(new_position)
-
-      new_rotation = np.arctan2(node_distance_vec[1], node_distance_vec[0])
       edge_particle.set_rotation(new_rotation)
 
       edge_particle.erase()
@@ -625,7 +672,7 @@ class TTR_Particle_Graph:
     Returns:
         [type]: [description]
     """
-    return list(self.particle_nodes.values()) + list(self.particle_labels.values()) + list(self.particle_edges.values())
+    return self._nodes_list + self._labels_list + self._edges_list
 
 
   def set_parameters(self, particle_parameters: dict) -> None:
@@ -725,10 +772,12 @@ class TTR_Particle_Graph:
         edge_color_map (dict): dictionary mapping edge colors to new colors
     """
     self.analysis_graph = None
-    for particle_edge in self.particle_edges.values():
-      if particle_edge.color in edge_color_map.keys():
-        particle_edge.color = edge_color_map[particle_edge.color]
-        particle_edge.set_image_file_path(None)
+    for particle_edge in self._edges_list:
+      if particle_edge.color in edge_color_map:
+        new_color = edge_color_map[particle_edge.color]
+        if new_color != particle_edge.color: # only reset the image if the color actually changed
+          particle_edge.color = new_color
+          particle_edge.set_image_file_path(None)
 
   def set_edge_images(self, edge_color_map: dict) -> None:
     """
@@ -826,11 +875,11 @@ class TTR_Particle_Graph:
     Args:
         ax (plt.Axes): axes to draw on
     """
-    for particle_edge in self.particle_edges.values():
+    for particle_edge in self._edges_list:
       particle_edge.draw(ax, color=particle_edge.color, border_color=edge_border_color, alpha=0.8 * alpha_multiplier, movable=movable)
-    for particle_node in self.particle_nodes.values():
+    for particle_node in self._nodes_list:
       particle_node.draw(ax, color="#222222", alpha=0.8 * alpha_multiplier, movable=movable)
-    for particle_label in self.particle_labels.values():
+    for particle_label in self._labels_list:
       particle_label.draw(
           ax,
           color=self.color_config["label_text_color"],
@@ -842,11 +891,11 @@ class TTR_Particle_Graph:
     """
     erase particle graph
     """
-    for particle_node in self.particle_nodes.values():
+    for particle_node in self._nodes_list:
       particle_node.erase()
-    for particle_label in self.particle_labels.values():
+    for particle_label in self._labels_list:
       particle_label.erase()
-    for particle_edge in self.particle_edges.values():
+    for particle_edge in self._edges_list:
       particle_edge.erase()
 
   def draw_nodes(self, ax: plt.Axes, alpha: float = 0.8, movable: bool = False) -> None:
@@ -856,14 +905,14 @@ class TTR_Particle_Graph:
         ax (plt.Axes): matplotlib axes to draw on
         alpha (float, optional): transparency multiplier. Defaults to 1.0.
     """
-    for particle_node in self.particle_nodes.values():
+    for particle_node in self._nodes_list:
       particle_node.draw(ax, color="#222222", alpha=alpha, movable=movable)
 
   def erase_nodes(self) -> None:
     """
     erase nodes of particle graph
     """
-    for particle_node in self.particle_nodes.values():
+    for particle_node in self._nodes_list:
       particle_node.erase()
 
   def draw_labels(self, ax: plt.Axes, alpha: float = 1.0, movable: bool = False) -> None:
@@ -873,19 +922,21 @@ class TTR_Particle_Graph:
         ax (plt.Axes): matplotlib axes to draw on
         alpha (float, optional): transparency multiplier. Defaults to 1.0.
     """
-    for particle_label in self.particle_labels.values():
+    label_extents = get_label_extents(self._labels_list)
+    for particle_label, label_extent in zip(self._labels_list, label_extents):
       particle_label.draw(
           ax,
           color=self.color_config["label_text_color"],
           border_color=self.color_config["label_outline_color"],
           alpha=alpha,
-          movable=movable)
+          movable=movable,
+          extent=tuple(label_extent))
 
   def erase_labels(self) -> None:
     """
     erase labels of particle graph
     """
-    for particle_label in self.particle_labels.values():
+    for particle_label in self._labels_list:
       particle_label.erase()
 
   def draw_edges(self,
@@ -903,7 +954,7 @@ class TTR_Particle_Graph:
         color (str, optional): color of the edges. Defaults to None (use color of edge).
         border_color (str, optional): color of the edge border. Defaults to "#555555".
     """
-    for particle_edge in self.particle_edges.values():
+    for particle_edge in self._edges_list:
       if color is None:
         edge_color = particle_edge.color
       else:
@@ -914,7 +965,7 @@ class TTR_Particle_Graph:
     """
     erase edges of particle graph
     """
-    for particle_edge in self.particle_edges.values():
+    for particle_edge in self._edges_list:
       particle_edge.erase()
 
   def draw_connections(self, ax: plt.Axes, alpha: float = 1.0) -> None:
@@ -1159,7 +1210,10 @@ class TTR_Particle_Graph:
         particle (Graph_Particle): particle to add
     """
     if isinstance(particle, Particle_Node):
+      if particle.label in self.particle_nodes:
+        self._nodes_list.remove(self.particle_nodes[particle.label])
       self.particle_nodes[particle.label] = particle
+      self._nodes_list.append(particle)
     elif isinstance(particle, Particle_Edge):
       loc_1: str = particle.location_1_name
       loc_2: str = particle.location_2_name
@@ -1179,8 +1233,13 @@ class TTR_Particle_Graph:
         print(f"New connection index: {connection_index}")
         particle.connection_index = connection_index
       self.particle_edges[particle_edge_identifier] = particle
+      self._edges_list.append(particle)
+      self._paths_dirty = True
     elif isinstance(particle, Particle_Label):
+      if particle.label in self.particle_labels:
+        self._labels_list.remove(self.particle_labels[particle.label])
       self.particle_labels[particle.label] = particle
+      self._labels_list.append(particle)
     self.max_particle_id += 1
 
   def add_connection(self, location_1: str, location_2: str, length: int, color: str, add_path: bool=False, ax:plt.Axes = None) -> None:
@@ -1204,11 +1263,13 @@ class TTR_Particle_Graph:
     while (location_1, location_2, 0, connection_index) in self.particle_edges or (location_2, location_1, 0, connection_index) in self.particle_edges:
       connection_index += 1
     print(f"Adding connection {connection_index} between {location_1} and {location_2} with {length} particles.")
+    # all edge particles lie on the line between the nodes and share the same rotation
+    node_distance_vec: np.ndarray = node_2.position - node_1.position
+    edge_rotation: float = np.arctan2(node_distance_vec[1], node_distance_vec[0])
     # create `length` edge particles between `node_1` and `node_2``
     for path_index in range(length):
       self.max_particle_id += 1
-      edge_position: np.ndarray = node_1.position + (node_2.position - node_1.position) * (path_index+1) / (length+1)
-      edge_rotation: float = np.arctan2(node_2.position[1] - node_1.position[1], node_2.position[0] - node_1.position[0])
+      edge_position: np.ndarray = node_1.position + node_distance_vec * (path_index+1) / (length+1)
       edge_particle: Graph_Particle = Particle_Edge(
           color=color,
           location_1_name=location_1,
@@ -1229,6 +1290,7 @@ class TTR_Particle_Graph:
       if location_1 > location_2: # sort locations alphabetically
         location_1, location_2 = location_2, location_1
       self.particle_edges[(location_1, location_2, path_index, connection_index)] = edge_particle
+      self._edges_list.append(edge_particle)
       last_particle = edge_particle
       if ax is not None:
         edge_particle.draw(ax)
@@ -1266,6 +1328,7 @@ class TTR_Particle_Graph:
 
     # delete connected labels
     self.particle_labels[particle_node.label].erase()
+    self._labels_list.remove(self.particle_labels[particle_node.label])
     del self.particle_labels[particle_node.label]
 
     # delete tasks containing the node
@@ -1282,6 +1345,7 @@ class TTR_Particle_Graph:
     # delete node
     # self.node_labels.remove(particle_node.label)
     self.particle_nodes[particle_node.label].erase()
+    self._nodes_list.remove(self.particle_nodes[particle_node.label])
     del self.particle_nodes[particle_node.label]
     
 
@@ -1314,6 +1378,7 @@ class TTR_Particle_Graph:
         break
     # remove edge particle
     if (loc_1, loc_2, path_index, connection_index) in self.particle_edges:
+      self._edges_list.remove(self.particle_edges[(loc_1, loc_2, path_index, connection_index)])
       del self.particle_edges[(loc_1, loc_2, path_index, connection_index)]
     else:
       print(f"Warning: Could not find edge particle to remove: {loc_1} -> {loc_2} ({path_index})")
@@ -1405,19 +1470,14 @@ class TTR_Particle_Graph:
   def build_paths(self) -> None:
     """
     calculate a list of all paths in the particle graph as tuples (location_1, location_2, length, color) from the list of edges
+    This is called automatically when `paths` is accessed after edge particles were added.
     """
     self.analysis_graph = None
-    locations_to_lengths = dict()
+    locations_to_lengths: defaultdict[tuple[str, str, str], int] = defaultdict(int)
     for (loc_1, loc_2, min_path_length, connection_index), edge in self.particle_edges.items():
       temp_key = (loc_1, loc_2, edge.color)
-      if not temp_key in locations_to_lengths:
-        locations_to_lengths[temp_key] = min_path_length
-        continue
-      if min_path_length > locations_to_lengths[temp_key]:
-        locations_to_lengths[temp_key] = min_path_length
-    self.paths = []
-    for (loc_1, loc_2, color), length in locations_to_lengths.items():
-      self.paths.append((loc_1, loc_2, length+1, color))
+      locations_to_lengths[temp_key] = max(locations_to_lengths[temp_key], min_path_length)
+    self.paths = [(loc_1, loc_2, length+1, color) for (loc_1, loc_2, color), length in locations_to_lengths.items()]
 
 
   def __str__(self) -> str:
@@ -1431,29 +1491,21 @@ class TTR_Particle_Graph:
     """
     return f"Particle graph with {len(self.node_labels)} nodes and {len(self.paths)} edges."
 
-  def to_json(self) -> str:
+  def to_dict(self) -> dict:
     """
-    converts a particle graph `self` into a JSON string containing info about the graph itself as well as all the particles it contains.
+    converts a particle graph `self` into a dictionary containing info about the graph itself as well as all the particles it contains.
     Particles are saved in three separate arrays:
     - `nodes`: contains all node particles
     - `edges`: contains all edge particles
     - `labels`: contains all label particles
 
     Returns:
-        str: JSON string representing the particle graph
+        dict: JSON-serializable dictionary representing the particle graph
     """
     all_particles = self.get_particle_list()
-    # add id's to all particles
-    # particle_id = self.max_particle_id
-    # for particle_node in all_particles:
-    #   try:
-    #     particle_node.set_id(particle_id)
-    #   except AttributeError:
-    #     particle_node.particle_id = particle_id
-    #   particle_id += 1
-    # get json string for all particles
+    # get dicts for all particles
     all_particles_dict: List[Dict[str, Any]] = [particle.to_dict() for particle in all_particles]
-    # get json string for all tasks
+    # get dicts for all tasks
     all_tasks_dict = [task.to_dict() for task in self.tasks.values()]
     
     project_info = {
@@ -1470,19 +1522,33 @@ class TTR_Particle_Graph:
         }
     }
     project_info["project_setup"] = self.project_setup_dict
-    return json.dumps(project_info, indent=2)
+    return project_info
+
+  def to_json(self, indent: int = 2) -> str:
+    """
+    converts a particle graph `self` into a JSON string. See `to_dict` for the structure.
+
+    Args:
+        indent (int, optional): indentation of the JSON string. Defaults to 2.
+
+    Returns:
+        str: JSON string representing the particle graph
+    """
+    return json.dumps(self.to_dict(), indent=indent)
 
-  def save_json(self, filepath: str, **kwargs) -> None:
+  def save_json(self, filepath: str, indent: int = None, **kwargs) -> None:
     """
-    Save particle graph as JSON file.
+    Save particle graph as JSON file. The JSON is streamed to the file directly without building the whole string in memory first.
 
     Args:
         filepath (str): filepath to save particle graph to. If the filepath does not end with `.json`, the extension will be added automatically.
+        indent (int, optional): indentation of the JSON file. Defaults to None (compact output).
     """
     if not filepath.endswith(".json"):
       filepath += ".json"
+    separators = (",", ":") if indent is None else None
     with open(filepath, "w", encoding="utf-8") as file:
-      file.write(self.to_json())
+      json.dump(self.to_dict(), file, indent=indent, separators=separators)
 
 
   @staticmethod
@@ -1517,23 +1583,24 @@ class TTR_Particle_Graph:
         project_setup = project_setup_dict,
       )
     particles_by_id: dict[int, Graph_Particle] = dict()
+    particles_with_connections: List[Tuple[Graph_Particle, List[int]]] = []
     max_particle_id: int = 0
     # load particles one at a time
     for particle_info in particle_dicts:
       # keep track of maximum particle ID
       if particle_info["id"] > max_particle_id:
         max_particle_id = particle_info["id"]
-      # (temporarily) remove some particle info that isn't needed for the next step
+      # remove some particle info that isn't needed for the next step
       connected_particles = particle_info.pop("connected_particles")
       particle_type = particle_info.pop("particle_type")
       
-      particle_info["position"] = np.array(particle_info["position"], dtype=np.float16)
+      particle_info["position"] = np.asarray(particle_info["position"], dtype=np.float16)
       particle_info["bounding_box_size"] = tuple(particle_info["bounding_box_size"])
       # add to graph: Particle Node (Location)
       if particle_type == "Particle_Node":
         # particle_info.pop("rotation")
         particle_info.pop("angular_velocity_decay")
-        particle_info["target_position"] = np.array(particle_info["target_position"], dtype=np.float16)
+        particle_info["target_position"] = np.asarray(particle_info["target_position"], dtype=np.float16)
         particle = Particle_Node(**particle_info)
         particle_graph.add_particle(particle)
       # add to graph: Particle Edge (partial connection between two locations)
@@ -1547,22 +1614,21 @@ class TTR_Particle_Graph:
         particle_info.pop("target_position")
         particle = Particle_Label(**particle_info)
         particle_graph.add_particle(particle)
-      # add connected particles back to particle info
-      particle_info["connected_particles"] = connected_particles
+      # remember connected particle IDs until all particles exist
+      particles_with_connections.append((particle, connected_particles))
       # add particle to ID
       particles_by_id[particle.get_id()] = particle
     # all particles have been added to graph and to particles_by_id
     # next: add connections to particles from their ids
-    for particle, particle_info in zip(particles_by_id.values(), particle_dicts):
+    for particle, connected_particle_ids in particles_with_connections:
       particle.set_connected_particles(
-          [particles_by_id[connected_particle_id] for connected_particle_id in particle_info["connected_particles"]]
+          [particles_by_id[connected_particle_id] for connected_particle_id in connected_particle_ids]
       )
     # set max id
     particle_graph.max_particle_id = max_particle_id
     if "graph_extent" in graph_info["particle_graph"]:
       particle_graph.set_graph_extent(np.array(graph_info["particle_graph"]["graph_extent"]))
-    # build list of paths in graph
-    particle_graph.build_paths()
+    # list of paths in graph is built lazily from the loaded edges
     particle_graph.update_tasks(graph_info["particle_graph"]["tasks"])
     return particle_graph
 